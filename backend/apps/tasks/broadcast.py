@@ -0,0 +1,126 @@
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+
+from .models import Task
+from .serializers import TaskListSerializer
+
+# Admins see every task, so their sockets only join the admin group; everyone else
+# joins their own user group and receives the tasks they created or are assigned.
+ADMIN_GROUP = 'tasks.admin'
+
+_state = threading.local()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='task-broadcast')
+
+
+def user_group(user_id):
+    return f'tasks.user.{user_id}'
+
+
+def groups_for_users(user_ids):
+    """The channel groups that must hear about a task touching these users."""
+    return [ADMIN_GROUP] + [user_group(user_id) for user_id in sorted(set(user_ids) - {None})]
+
+
+def split_by_group(tasks_data, previous_user_ids=None):
+    """
+    Maps each channel group to the serialized tasks its sockets should receive, and
+    each group that lost sight of a task to the ids it should drop. ``previous_user_ids``
+    maps a task id to users who could see it before, such as the previous assignee
+    of a reassigned task; they only learn its id, not its new contents.
+    """
+    previous_user_ids = previous_user_ids or {}
+    audience = defaultdict(list)
+    removed = defaultdict(list)
+    for task_data in tasks_data:
+        user_ids = {task_data['created_by'], task_data['assigned_to']}
+        for group in groups_for_users(user_ids):
+            audience[group].append(task_data)
+        for user_id in sorted(set(previous_user_ids.get(task_data['id'], ())) - user_ids):
+            removed[user_group(user_id)].append(task_data['id'])
+    return audience, removed
+
+
+class _Outbox:
+    """Task ids saved in the current transaction, broadcast together once it commits."""
+
+    def __init__(self):
+        self.pending = {}
+
+    def flush(self):
+        # Every write queues a flush; the first one of a commit sends the batch and the
+        # rest find it empty. Ids left over from a rolled-back transaction go out with
+        # the next batch, which only repeats the tasks' current state.
+        pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        if settings.TASK_BROADCAST_IN_BACKGROUND:
+            _executor.submit(_send_in_background, pending)
+        else:
+            send_task_updates(pending)
+
+
+def _outbox(using):
+    """The outbox of this thread's connection to ``using``."""
+    outboxes = getattr(_state, 'outboxes', None)
+    if outboxes is None:
+        outboxes = _state.outboxes = {}
+    if using not in outboxes:
+        outboxes[using] = _Outbox()
+    return outboxes[using]
+
+
+def queue_task_broadcast(task_ids, previous_assignees=None):
+    """
+    Queues the given tasks for broadcast when the current transaction commits.
+    Saving the same task several times in one transaction sends it once.
+    """
+    using = router.db_for_write(Task)
+    outbox = _outbox(using)
+    for task_id in task_ids:
+        outbox.pending.setdefault(task_id, set())
+    for task_id, user_id in (previous_assignees or {}).items():
+        if user_id is not None:
+            outbox.pending.setdefault(task_id, set()).add(user_id)
+    transaction.on_commit(outbox.flush, using=using)
+
+
+def send_task_updates(pending):
+    """
+    Serializes the pending tasks in one query and sends one message per audience
+    group, plus the ids of the tasks that groups no longer see.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None or not pending:
+        return
+    reader = TaskListSerializer()
+    tasks_data = reader.many(Task.objects.filter(id__in=pending).order_by('id').values(*reader.columns()))
+    audience, removed = split_by_group(tasks_data, pending)
+    for group, group_tasks_data in audience.items():
+        async_to_sync(channel_layer.group_send)(
+            group,
+            {
+                'type': 'tasks_update',
+                'tasks_data': group_tasks_data
+            }
+        )
+    for group, task_ids in removed.items():
+        async_to_sync(channel_layer.group_send)(
+            group,
+            {
+                'type': 'tasks_removed',
+                'task_ids': task_ids
+            }
+        )
+
+
+def _send_in_background(pending):
+    try:
+        send_task_updates(pending)
+    finally:
+        close_old_connections()
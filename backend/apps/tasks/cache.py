@@ -0,0 +1,89 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.caching import invalidate_tags, record, register_metrics, start_tag_version, tag_version
+from core.db_router import may_be_stale
+
+from ..users.cache import USERS_TAG
+from .permissions import is_admin
+
+DASHBOARD_KEY = 'tasks:dashboard:{user_id}:{version}:{day}'
+DASHBOARD_METRICS = register_metrics('tasks:dashboard')
+ADMIN_TAG = 'tasks:admin'
+USER_TAG = 'tasks:user:{user_id}'
+TASK_TAG = 'tasks:task:{task_id}'
+
+
+# Tag versions (core.caching) are nanosecond timestamps of the last change.
+
+def collection_tag(user, admin):
+    """
+    Tag of the set of tasks ``user`` can see. Admins see every task, so they share
+    one tag that any task change invalidates; everyone else has their own.
+    """
+    return ADMIN_TAG if admin else USER_TAG.format(user_id=user.pk)
+
+
+def collection_version(user, admin):
+    return tag_version(collection_tag(user, admin))
+
+
+def object_version(task_id):
+    """
+    Version of one task, or None if it has none yet. Not created here: the id comes
+    from the URL, and a version for every id a client asks for would never be dropped.
+    """
+    return tag_version(TASK_TAG.format(task_id=task_id), create=False)
+
+
+def start_object_version(task_id):
+    # Called once the task is known to exist and be visible; expires like the ones tasks_changed sets.
+    start_tag_version(TASK_TAG.format(task_id=task_id), timeout=settings.TASK_TAG_TIMEOUT)
+
+
+def task_list_tags(request, *args, **kwargs):
+    # Listed tasks show their creator's and assignee's usernames.
+    return [collection_tag(request.user, admin=is_admin(request.user)), USERS_TAG]
+
+
+def task_list_vary(request):
+    # ?overdue= changes at midnight without any task changing.
+    return [timezone.localdate().isoformat()]
+
+
+def dashboard_cache_key(user, admin):
+    # The date is part of the key because "due today" changes at midnight.
+    return DASHBOARD_KEY.format(
+        user_id=user.pk,
+        version=collection_version(user, admin),
+        day=date.today().isoformat(),
+    )
+
+
+def get_dashboard(key):
+    data = cache.get(key)
+    record(DASHBOARD_METRICS, hit=data is not None)
+    return data
+
+
+def set_dashboard(key, data, user, admin):
+    # Counts read from a lagging replica must not be stored under the new version
+    if not may_be_stale(collection_version(user, admin)):
+        cache.set(key, data, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+
+
+def tasks_changed(task_ids, user_ids):
+    """
+    Invalidates the tags of the given tasks, of the given users' task collections and
+    of the admin collection. Cached dashboards, lists and ETags derived from them go stale.
+    """
+    tags = [ADMIN_TAG]
+    tags += [USER_TAG.format(user_id=user_id) for user_id in set(user_ids) - {None}]
+    invalidate_tags(tags)
+    task_tags = [TASK_TAG.format(task_id=task_id) for task_id in set(task_ids) - {None}]
+    if task_tags:
+        # One per task ever written: let them expire rather than keep them forever
+        invalidate_tags(task_tags, timeout=settings.TASK_TAG_TIMEOUT)
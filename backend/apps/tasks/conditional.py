@@ -0,0 +1,96 @@
+"""
+ETag validators for task reads.
+
+Every validator is derived from the version counters in ``cache``, which the task
+signals bump. A conditional GET is therefore answered with a cache lookup, before
+any queryset is built or serialized.
+
+No Last-Modified is sent. HTTP dates are whole seconds, so two writes within one
+second would share a Last-Modified and If-Modified-Since would answer 304 for the
+older data; versions are nanoseconds and the ETags carry them whole. For a task,
+If-Modified-Since could also be sent for any id, whereas an ETag names a version
+the client was given. A task only gets a detail ETag once it has a version, which is
+set when it is written or has been served to someone allowed to see it.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from core.caching import tag_versions
+from core.db_router import may_be_stale
+
+from . import cache
+from .permissions import is_admin
+
+
+def _etag(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _representation(request):
+    # The same resource rendered differently (format, page, filters) needs its own ETag.
+    return request.META.get('HTTP_ACCEPT', ''), request.GET.urlencode()
+
+
+def collection_version(request, *args, **kwargs):
+    return cache.collection_version(request.user, admin=is_admin(request.user))
+
+
+def task_version(request, *args, **kwargs):
+    return cache.object_version(kwargs['pk'])
+
+
+def list_versions(request):
+    # Listed tasks embed usernames, so renaming a user changes the list too
+    return tag_versions(cache.task_list_tags(request))
+
+
+def list_version(request, *args, **kwargs):
+    return max(list_versions(request))
+
+
+def task_list_etag(request, *args, **kwargs):
+    # The vary values (today's date for ?overdue=) change the list without any write
+    return _etag(
+        'list', request.user.pk, *list_versions(request), *cache.task_list_vary(request), *_representation(request),
+    )
+
+
+def task_detail_etag(request, *args, **kwargs):
+    version = task_version(request, *args, **kwargs)
+    if version is None:
+        return None
+    # Admins see every task; one who is demoted must not revalidate what they no longer can see
+    return _etag('detail', request.user.pk, is_admin(request.user), kwargs['pk'], version, *_representation(request))
+
+
+def dashboard_etag(request, *args, **kwargs):
+    return _etag(cache.dashboard_cache_key(request.user, admin=is_admin(request.user)), *_representation(request))
+
+
+def revalidate(version):
+    """
+    Lets browsers keep the response but makes them revalidate it on every use.
+    ``version(request, *args, **kwargs)`` is the version the validators name.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            # A body read from a lagging replica may predate the version the validators
+            # name; without them the client will not keep it.
+            changed_at = version(request, *args, **kwargs)
+            if changed_at is not None and may_be_stale(changed_at) and 'ETag' in response:
+                del response['ETag']
+            return response
+        return wrapper
+    return decorator
+
+
+conditional_task_list = method_decorator([revalidate(list_version), condition(etag_func=task_list_etag)])
+conditional_task_detail = method_decorator([revalidate(task_version), condition(etag_func=task_detail_etag)])
+conditional_dashboard = method_decorator([revalidate(collection_version), condition(etag_func=dashboard_etag)])
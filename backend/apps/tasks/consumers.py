@@ -2,15 +2,34 @@
 
 import json
 
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
-from .models import Task
-from .serializers import TaskSerializer
+from .broadcast import ADMIN_GROUP, user_group
+from .models import TaskStatus
+from .permissions import is_admin
+from .services import TaskService
+
+STATUS_VALUES = {status.value for status in TaskStatus}
 
 
 class TaskConsumer(AsyncWebsocketConsumer):
+    """
+    Receives status updates either as a single ``{"task_id": 1, "status": "..."}``
+    message or as a batch ``{"updates": [{"task_id": 1, "status": "..."}, ...]}``.
+    A batch is written with one database round trip and reaches the other sockets
+    as one broadcast through the task outbox; the sender gets an ack per item.
+    """
+
     async def connect(self):
-        self.room_group_name = 'tasks_updates'
+        self.user = self.scope.get('user')
+        if self.user is None or not self.user.is_authenticated:
+            await self.close()
+            return
+        if await database_sync_to_async(is_admin)(self.user):
+            self.room_group_name = ADMIN_GROUP
+        else:
+            self.room_group_name = user_group(self.user.pk)
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -18,30 +37,53 @@ class TaskConsumer(AsyncWebsocketConsumer):
         await self.accept()
 
     async def disconnect(self, close_code):
+        if not hasattr(self, 'room_group_name'):
+            return
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
     async def receive(self, text_data):
-        text_data_json = json.loads(text_data)
-        task_id = text_data_json['task_id']
-        task = Task.objects.get(id=task_id)
-        task.status = 'completed'  # Example: change status
-        task.save()
-
-        # Send updated task data to WebSocket
-        task_data = TaskSerializer(task).data
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'task_update',
-                'task_data': task_data
-            }
+        try:
+            message = json.loads(text_data)
+            items = message['updates'] if 'updates' in message else [message]
+        except (TypeError, ValueError, KeyError):
+            await self.send(text_data=json.dumps({'error': 'Malformed message.'}))
+            return
+
+        acks = []
+        updates = {}
+        for item in items:
+            task_id = item.get('task_id') if isinstance(item, dict) else None
+            new_status = item.get('status', TaskStatus.COMPLETED.value) if isinstance(item, dict) else None
+            if not isinstance(task_id, int):
+                acks.append({'task_id': task_id, 'ok': False, 'error': 'Invalid task id.'})
+            elif new_status not in STATUS_VALUES:
+                acks.append({'task_id': task_id, 'ok': False, 'error': 'Invalid status.'})
+            else:
+                updates[task_id] = new_status
+
+        updated_ids = await self.apply_updates(updates) if updates else set()
+        acks.extend(
+            {'task_id': task_id, 'ok': True} if task_id in updated_ids
+            else {'task_id': task_id, 'ok': False, 'error': 'Task not found.'}
+            for task_id in updates
         )
 
-    async def task_update(self, event):
-        task_data = event['task_data']
+        await self.send(text_data=json.dumps({'acks': acks}))
+
+    @database_sync_to_async
+    def apply_updates(self, updates):
+        tasks = TaskService.update_statuses(updates, user=self.user)
+        return {task.id for task in tasks}
+
+    async def tasks_update(self, event):
+        await self.send(text_data=json.dumps({
+            'tasks_data': event['tasks_data']
+        }))
+
+    async def tasks_removed(self, event):
         await self.send(text_data=json.dumps({
-            'task_data': task_data
+            'removed_task_ids': event['task_ids']
         }))
@@ -0,0 +1,177 @@
+"""
+Materialized dashboard counts (TaskCounter).
+
+Every task adds one to a few counters of each user who can see it (its creator and
+its assignee) and of ALL_TASKS: the total, its status, its priority while it is
+open and its due date, plus its assignee's "assigned" counter. Task writes lock the
+rows they change, read their counted state (current_states) and apply the difference
+between the old and new contributions with atomic F() updates in the same
+transaction, so the dashboard reads a handful of rows instead of aggregating tasks. rebuild() recomputes
+the counters from the Task table and reports any drift.
+"""
+from collections import Counter, defaultdict
+from datetime import date
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import connection, router, transaction
+from django.db.models import Case, F, Q, Value, When
+
+from .models import PriorityEnum, Task, TaskCounter, TaskStatus
+
+TOTAL = 'total'
+ASSIGNED = 'assigned'
+STATUS_KEY = 'status:{status}'
+PRIORITY_KEY = 'priority:{priority}'
+DUE_KEY = 'due:{day}'
+
+# Task columns the counters depend on, in the order of a counted state
+COUNTED_FIELDS = ('created_by_id', 'assigned_to_id', 'status', 'priority', 'due_date')
+COMPLETED = TaskStatus.COMPLETED.value
+# Counters changed by one statement; keeps the OR of (user_id, key) pairs bounded
+APPLY_BATCH_SIZE = 500
+
+
+def counted_state(task):
+    """The task's counted columns as they are on the instance, or None if any is deferred."""
+    values = task.__dict__
+    if any(field not in values for field in COUNTED_FIELDS):
+        return None
+    return tuple(values[field] for field in COUNTED_FIELDS)
+
+
+def current_states(task_ids):
+    """
+    ``{task_id: counted state}`` of the tasks as their rows are now. Inside a transaction
+    the rows stay locked until it ends, so concurrent writes of the same task apply
+    their differences one after the other.
+    """
+    using = router.db_for_write(Task)
+    queryset = Task.objects.using(using).filter(pk__in=task_ids).order_by('pk')
+    if transaction.get_connection(using).in_atomic_block:
+        queryset = queryset.select_for_update()
+    return {pk: tuple(state) for pk, *state in queryset.values_list('pk', *COUNTED_FIELDS)}
+
+
+def saved_state(task, old, update_fields=None):
+    """
+    The counted state after ``task`` was saved over ``old``: the columns the save wrote
+    (all loaded ones, or only ``update_fields``) and ``old`` for the rest.
+    """
+    if old is None:
+        return counted_state(task)
+    values = task.__dict__
+    if update_fields is None:
+        saved = set(COUNTED_FIELDS)
+    else:
+        saved = {Task._meta.get_field(name).attname for name in update_fields}
+    return tuple(
+        values[field] if field in saved and field in values else previous
+        for field, previous in zip(COUNTED_FIELDS, old)
+    )
+
+
+def contributions(state):
+    """The counters a task in ``state`` adds one to; None adds nothing."""
+    result = Counter()
+    if state is None:
+        return result
+    created_by_id, assigned_to_id, status, priority, due_date = state
+    keys = [TOTAL, STATUS_KEY.format(status=status)]
+    if status != COMPLETED:
+        keys.append(PRIORITY_KEY.format(priority=priority))
+    if due_date is not None:
+        keys.append(DUE_KEY.format(day=due_date))
+    for user_id in {TaskCounter.ALL_TASKS, created_by_id, assigned_to_id} - {None}:
+        result.update((user_id, key) for key in keys)
+    if assigned_to_id is not None:
+        result[(assigned_to_id, ASSIGNED)] += 1
+    return result
+
+
+def tasks_changed(changes):
+    """
+    Updates the counters for ``[(old_state, new_state), ...]``, where None stands for
+    a task that did not exist yet or no longer does.
+    """
+    deltas = Counter()
+    for old, new in changes:
+        deltas.update(contributions(new))
+        deltas.subtract(contributions(old))
+    apply(deltas)
+
+
+def apply(deltas):
+    """Adds ``{(user_id, key): delta}`` to the counters, creating missing rows first."""
+    # Sorted so concurrent writers lock rows in the same order
+    items = sorted((pair, delta) for pair, delta in deltas.items() if delta)
+    iterator = iter(items)
+    # Part of the caller's transaction when there is one; a savepoint would only add round-trips
+    with transaction.atomic(savepoint=False):
+        while batch := list(islice(iterator, APPLY_BATCH_SIZE)):
+            TaskCounter.objects.bulk_create(
+                [TaskCounter(user_id=user_id, key=key) for (user_id, key), _ in batch], ignore_conflicts=True,
+            )
+            by_delta = defaultdict(list)
+            for (user_id, key), delta in batch:
+                by_delta[delta].append(Q(user_id=user_id, key=key))
+            TaskCounter.objects.filter(reduce(or_, [match for matches in by_delta.values() for match in matches])).update(
+                count=F('count') + Case(
+                    *[When(reduce(or_, matches), then=Value(delta)) for delta, matches in by_delta.items()],
+                    default=Value(0),
+                ),
+            )
+
+
+def dashboard_counts(user, admin):
+    """``{key: count}`` of every counter on the user's dashboard, read with one query."""
+    scope = TaskCounter.ALL_TASKS if admin else user.pk
+    keys = [TOTAL, DUE_KEY.format(day=date.today())]
+    keys += [STATUS_KEY.format(status=status.value) for status in TaskStatus]
+    keys += [PRIORITY_KEY.format(priority=priority.value) for priority in PriorityEnum]
+    rows = TaskCounter.objects.filter(Q(user_id=scope, key__in=keys) | Q(user_id=user.pk, key=ASSIGNED))
+    return dict(rows.values_list('key', 'count'))
+
+
+def expected_counts():
+    """Every counter recomputed from the Task table."""
+    counts = Counter()
+    for state in Task.objects.order_by().values_list(*COUNTED_FIELDS).iterator(chunk_size=5000):
+        counts.update(contributions(state))
+    return counts
+
+
+def find_drift(expected=None):
+    """``{(user_id, key): (stored, expected)}`` for every counter that is off."""
+    if expected is None:
+        expected = expected_counts()
+    stored = {(user_id, key): count for user_id, key, count in TaskCounter.objects.values_list('user_id', 'key', 'count')}
+    return {
+        pair: (stored.get(pair, 0), expected.get(pair, 0))
+        for pair in stored.keys() | expected.keys()
+        if stored.get(pair, 0) != expected.get(pair, 0)
+    }
+
+
+def rebuild():
+    """
+    Corrects every counter that drifted from the Task table and returns the drift, as
+    find_drift() does, then deletes the counters that dropped to zero: a missing row
+    counts as zero, and each past due date would otherwise keep one per user forever.
+    On PostgreSQL task writes wait until it is done, so that none is lost between
+    reading the tasks and writing the counters, or increments a row being deleted.
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(Task._meta.db_table)} IN SHARE MODE')
+        drift = find_drift(expected_counts())
+        TaskCounter.objects.bulk_create(
+            [TaskCounter(user_id=user_id, key=key, count=expected) for (user_id, key), (_, expected) in drift.items()],
+            update_conflicts=True, unique_fields=['user_id', 'key'], update_fields=['count'],
+            batch_size=APPLY_BATCH_SIZE,
+        )
+        # Not in apply(): a concurrent write that already found the row would increment nothing
+        TaskCounter.objects.filter(count=0).delete()
+    return drift
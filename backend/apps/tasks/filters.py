@@ -1,16 +1,75 @@
 # tasks/filters.py
 
 import django_filters
-from rest_framework.authtoken.admin import User
+from django import forms
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils import timezone
 
-from .models import Task
+from .models import PriorityEnum, Task, TaskStatus
+
+# Spelled as an IN list rather than "status != Completed" so overdue lookups can use task_status_due_idx
+OPEN_STATUSES = [status.value for status in TaskStatus if status is not TaskStatus.COMPLETED]
+
+
+class ChoiceInFilter(django_filters.BaseInFilter, django_filters.ChoiceFilter):
+    """Comma-separated list of choices, e.g. ``?status__in=Pending,On Hold``."""
+
+
+class UserIdFilter(django_filters.NumberFilter):
+    field_class = forms.IntegerField
+
+
+class UserIdInFilter(django_filters.BaseInFilter, UserIdFilter):
+    """Comma-separated list of user ids, e.g. ``?assigned_to__in=3,7``."""
+
+
+class TaskFilterForm(forms.Form):
+    ASSIGNEE_FIELDS = ('assigned_to', 'assigned_to__in')
+
+    def clean(self):
+        """Checks every assignee id in the request with one primary-key IN query."""
+        cleaned_data = super().clean()
+        requested = {
+            name: [cleaned_data[name]] if name == 'assigned_to' else cleaned_data[name]
+            for name in self.ASSIGNEE_FIELDS if cleaned_data.get(name) not in (None, [])
+        }
+        ids = {user_id for user_ids in requested.values() for user_id in user_ids}
+        if ids:
+            known = set(User.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            for name, user_ids in requested.items():
+                for user_id in user_ids:
+                    if user_id not in known:
+                        self.add_error(name, f"Invalid pk \"{user_id}\" - object does not exist.")
+        return cleaned_data
 
 
 class TaskFilter(django_filters.FilterSet):
-    due_date = django_filters.DateFilter(field_name='due_date', lookup_expr='lte')
-    priority = django_filters.ChoiceFilter(choices=Task.PRIORITY_CHOICES)
-    assigned_to = django_filters.ModelChoiceFilter(queryset=User.objects.all())
+    """
+    Every filter compiles to a plain comparison on an indexed column (see Task.Meta.indexes):
+    equality and IN on status/priority, ranges on due_date and created_on, IS NULL on assigned_to.
+    """
+    due_date = django_filters.DateFilter(field_name='due_date')
+    due_date__gte = django_filters.DateFilter(field_name='due_date', lookup_expr='gte')
+    due_date__lte = django_filters.DateFilter(field_name='due_date', lookup_expr='lte')
+    created_on__gte = django_filters.IsoDateTimeFilter(field_name='created_on', lookup_expr='gte')
+    created_on__lt = django_filters.IsoDateTimeFilter(field_name='created_on', lookup_expr='lt')
+    priority = django_filters.ChoiceFilter(choices=PriorityEnum.choices())
+    priority__in = ChoiceInFilter(field_name='priority', choices=PriorityEnum.choices())
+    status = django_filters.ChoiceFilter(choices=TaskStatus.choices())
+    status__in = ChoiceInFilter(field_name='status', choices=TaskStatus.choices())
+    # Plain ids checked by TaskFilterForm; look users up through /api/users/assignees/
+    assigned_to = UserIdFilter(field_name='assigned_to_id')
+    assigned_to__in = UserIdInFilter(field_name='assigned_to_id', lookup_expr='in')
+    unassigned = django_filters.BooleanFilter(field_name='assigned_to', lookup_expr='isnull')
+    overdue = django_filters.BooleanFilter(method='filter_overdue')
 
     class Meta:
         model = Task
-        fields = ['due_date', 'priority', 'assigned_to', 'status']
+        fields = []
+        form = TaskFilterForm
+
+    def filter_overdue(self, queryset, name, value):
+        today = timezone.localdate()
+        overdue = Q(due_date__lt=today, status__in=OPEN_STATUSES)
+        return queryset.filter(overdue if value else ~overdue)
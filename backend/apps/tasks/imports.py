@@ -0,0 +1,40 @@
+import codecs
+import csv
+import json
+import os
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+_EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+
+def detect_format(filename, default=None):
+    """Guesses the import format from a file name, e.g. ``tasks.jsonl`` -> ``ndjson``."""
+    return _EXTENSIONS.get(os.path.splitext(filename or '')[1].lower(), default)
+
+
+def decode_upload(upload):
+    """Decodes an uploaded file line by line without reading it into memory."""
+    upload.seek(0)
+    return codecs.getreader('utf-8-sig')(upload)
+
+
+def read_records(lines, file_format):
+    """
+    Parses ``lines`` lazily and yields ``(line_number, record)``. ``record`` is a dict,
+    or None for an NDJSON line that does not hold a JSON object.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else None
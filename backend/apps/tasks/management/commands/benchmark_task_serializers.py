@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.tasks.models import Task
+from apps.tasks.renderers import ORJSONRenderer, orjson
+from apps.tasks.serializers import TaskListSerializer, TaskSerializer
+from apps.tasks.services import TaskService
+from rest_framework.renderers import JSONRenderer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares rows/second of TaskSerializer against the TaskListSerializer fast path. "
+        "Seeds the tasks inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        creator = User.objects.create(username='benchmark-creator')
+        assignee = User.objects.create(username='benchmark-assignee')
+        Task.objects.bulk_create(
+            [Task(title=f'Benchmark {i}', created_by=creator, assigned_to=assignee if i % 2 else None)
+             for i in range(rows)],
+            batch_size=1000,
+        )
+        queryset = TaskService.get_tasks_for_user(creator)
+        reader = TaskListSerializer()
+
+        def task_serializer():
+            data = TaskSerializer(TaskService.shape_for_serialization(queryset), many=True).data
+            return JSONRenderer().render(data)
+
+        def fast_path():
+            return JSONRenderer().render(reader.many(queryset.values(*reader.columns())))
+
+        candidates = [('TaskSerializer + JSONRenderer', task_serializer), ('fast path + JSONRenderer', fast_path)]
+        if orjson is not None:
+            candidates.append((
+                'fast path + ORJSONRenderer',
+                lambda: ORJSONRenderer().render(reader.many(queryset.values(*reader.columns()))),
+            ))
+
+        baseline = None
+        for name, render in candidates:
+            best = min(self.time(render) for _ in range(repeat))
+            rate = rows / best
+            baseline = baseline or rate
+            self.stdout.write(f'{name:32} {rate:>12,.0f} rows/s  ({rate / baseline:.1f}x)')
+
+    @staticmethod
+    def time(render):
+        start = time.perf_counter()
+        render()
+        return time.perf_counter() - start
@@ -0,0 +1,23 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.caching import metrics, reset_metrics
+
+
+class Command(BaseCommand):
+    help = "Shows hits, misses and hit rate of each cache, counted across every process."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after showing them.")
+
+    def handle(self, *args, **options):
+        # Caches register their names when their views are imported.
+        import_module(settings.ROOT_URLCONF)
+        for name, counts in metrics().items():
+            rate = 'n/a' if counts['hit_rate'] is None else f"{counts['hit_rate']:.1%}"
+            self.stdout.write(f"{name}: {counts['hits']} hits, {counts['misses']} misses, hit rate {rate}")
+        if options['reset']:
+            reset_metrics()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tasks.imports import IMPORT_FORMATS, detect_format, read_records
+from apps.tasks.services import TaskService
+
+
+class Command(BaseCommand):
+    help = "Imports tasks from a CSV or NDJSON file, created by the given user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Username recorded as the creator of the tasks.")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, help="Defaults to TASK_IMPORT_BATCH_SIZE.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user \"{options['user']}\".")
+        file_format = options['format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError("Cannot tell the file format from its name; pass --format.")
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as lines:
+            created, rejected, errors = TaskService.import_tasks(
+                user, read_records(lines, file_format), batch_size=options['batch_size']
+            )
+
+        for line in sorted(errors):
+            self.stderr.write(f"line {line}: {errors[line]}")
+        self.stdout.write(self.style.SUCCESS(f"Created {created} tasks, rejected {rejected}."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tasks import cache, counters
+from apps.tasks.models import TaskCounter
+
+# Drifted counters listed before the rest are summarized
+SHOWN_DRIFT = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the dashboard counters (TaskCounter) from the tasks and corrects the "
+        "ones that drifted. With --check, only reports the drift and fails if there is any."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Report drift without correcting it.")
+
+    def handle(self, *args, **options):
+        drift = counters.find_drift() if options['check'] else counters.rebuild()
+        for (user_id, key), (stored, expected) in sorted(drift.items())[:SHOWN_DRIFT]:
+            scope = 'all tasks' if user_id == TaskCounter.ALL_TASKS else f'user {user_id}'
+            self.stdout.write(f"{scope} {key}: stored {stored}, expected {expected}")
+        if len(drift) > SHOWN_DRIFT:
+            self.stdout.write(f"... and {len(drift) - SHOWN_DRIFT} more")
+
+        if options['check']:
+            if drift:
+                raise CommandError(f"{len(drift)} task counters drifted; run rebuild_task_counters to fix them.")
+            self.stdout.write(self.style.SUCCESS("Task counters match the tasks."))
+            return
+        if drift:
+            # Cached dashboards hold the wrong figures
+            cache.tasks_changed([], {user_id for user_id, _ in drift})
+        self.stdout.write(self.style.SUCCESS(f"Corrected {len(drift)} task counters."))
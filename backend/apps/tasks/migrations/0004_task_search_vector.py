@@ -0,0 +1,67 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Keep in step with apps.tasks.search.SEARCH_CONFIG.
+CREATE_TRIGGER = [
+    """
+CREATE FUNCTION tasks_task_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+""",
+    """
+CREATE TRIGGER tasks_task_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description, search_vector ON tasks_task
+    FOR EACH ROW EXECUTE FUNCTION tasks_task_search_vector_update()
+""",
+    # Fires the trigger for existing rows
+    'UPDATE tasks_task SET search_vector = NULL',
+    'CREATE INDEX task_search_idx ON tasks_task USING gin (search_vector)',
+]
+
+DROP_TRIGGER = [
+    'DROP INDEX IF EXISTS task_search_idx',
+    'DROP TRIGGER IF EXISTS tasks_task_search_vector_trigger ON tasks_task',
+    'DROP FUNCTION IF EXISTS tasks_task_search_vector_update()',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_task_updated_at_tasktombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # The trigger, the backfill and the GIN index only exist on PostgreSQL; other
+        # databases fall back to LIKE matching (see apps.tasks.search).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='task',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='task_search_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(run_on_postgresql(CREATE_TRIGGER), run_on_postgresql(DROP_TRIGGER)),
+            ],
+        ),
+    ]
@@ -0,0 +1,61 @@
+from collections import Counter
+
+from django.db import migrations, models
+
+
+# A frozen copy of apps.tasks.counters.contributions() as of this migration, so later
+# changes to the counters cannot change what it writes.
+ALL_TASKS = 0
+COMPLETED = 'Completed'
+
+
+def contributions(created_by_id, assigned_to_id, status, priority, due_date):
+    keys = ['total', f'status:{status}']
+    if status != COMPLETED:
+        keys.append(f'priority:{priority}')
+    if due_date is not None:
+        keys.append(f'due:{due_date}')
+    for user_id in {ALL_TASKS, created_by_id, assigned_to_id} - {None}:
+        for key in keys:
+            yield user_id, key
+    if assigned_to_id is not None:
+        yield assigned_to_id, 'assigned'
+
+
+def fill_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskCounter = apps.get_model('tasks', 'TaskCounter')
+    db_alias = schema_editor.connection.alias
+    counts = Counter()
+    states = Task.objects.using(db_alias).order_by().values_list(
+        'created_by_id', 'assigned_to_id', 'status', 'priority', 'due_date',
+    )
+    for state in states.iterator(chunk_size=5000):
+        counts.update(contributions(*state))
+    TaskCounter.objects.using(db_alias).bulk_create(
+        [TaskCounter(user_id=user_id, key=key, count=count) for (user_id, key), count in counts.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField()),
+                ('key', models.CharField(max_length=40)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'key'), name='task_counter_user_key_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,12 @@ from datetime import datetime
 from enum import Enum
 
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
 
 
 class TaskStatus(Enum):
@@ -41,10 +46,79 @@ class Task(models.Model):
         choices=TaskStatus.choices(),  # Use Enum choices for task status
         default=TaskStatus.NOT_STARTED.value
     )
-    created_by = models.ForeignKey(User, related_name='created_tasks', on_delete=models.CASCADE)
+    # The composite indexes in Meta lead with these columns, so the FKs don't need their own.
+    created_by = models.ForeignKey(User, related_name='created_tasks', on_delete=models.CASCADE, db_index=False)
     assigned_to = models.ForeignKey(User, related_name='assigned_tasks', on_delete=models.SET_NULL, null=True,
-                                    blank=True)
+                                    blank=True, db_index=False)
     created_on = models.DateTimeField(default=datetime.now, editable=False)
+    # Change tracking for delta sync; bulk writes must set it explicitly.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Weighted title/description tsvector for ?q= search. On PostgreSQL a trigger
+    # (migration 0004) keeps it current, including for bulk writes; elsewhere it stays NULL.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Visibility filter (created_by OR assigned_to) in list order
+            models.Index(fields=['created_by', 'created_on', 'id'], name='task_owner_created_idx'),
+            models.Index(fields=['assigned_to', 'created_on', 'id'], name='task_assignee_created_idx'),
+            # Admin listing and cursor pagination
+            models.Index(fields=['created_on', 'id'], name='task_created_idx'),
+            # TaskFilter lookups
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            models.Index(fields=['priority', 'due_date'], name='task_priority_due_idx'),
+            # Dashboard "due today" and due_date range filters; most tasks have no due date
+            models.Index(fields=['due_date'], name='task_due_date_idx', condition=Q(due_date__isnull=False)),
+            # Case-insensitive duplicate title check per creator
+            models.Index(Lower('title'), 'created_by', name='task_title_lower_idx'),
+            # Delta sync (?since=)
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+            # Full-text search; created on PostgreSQL only
+            GinIndex(fields=['search_vector'], name='task_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class TaskTombstone(models.Model):
+    """
+    Records that a task left a user's view, so delta-sync clients can drop it.
+    DELETED tombstones are written when a task is deleted; UNASSIGNED ones when a
+    task is reassigned away from someone who is not its creator.
+    """
+    DELETED = 'deleted'
+    UNASSIGNED = 'unassigned'
+    REASON_CHOICES = [(DELETED, 'Deleted'), (UNASSIGNED, 'Unassigned')]
+
+    task_id = models.BigIntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, default=DELETED)
+    # Plain ids rather than foreign keys: the tombstone must outlive the users too.
+    created_by_id = models.BigIntegerField(null=True)
+    assigned_to_id = models.BigIntegerField(null=True)
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f'{self.task_id} ({self.reason})'
+
+
+class TaskCounter(models.Model):
+    """
+    One dashboard figure for one user, e.g. (7, 'status:Pending'), kept current
+    incrementally by apps.tasks.counters as tasks are written. ``user_id`` ALL_TASKS
+    counts every task, which is what admins see.
+    """
+    ALL_TASKS = 0
+
+    # A plain id: ALL_TASKS is not a user, and rows of deleted users are dropped by a signal.
+    user_id = models.BigIntegerField()
+    key = models.CharField(max_length=40)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'key'], name='task_counter_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.key}: {self.count}'
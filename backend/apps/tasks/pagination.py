@@ -0,0 +1,27 @@
+from rest_framework.pagination import CursorPagination
+
+from .search import RANK_FIELD
+
+
+class TaskCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_on, id) so every page costs the same
+    regardless of how deep the client has scrolled. The page size defaults to
+    the REST_FRAMEWORK PAGE_SIZE setting and can be tuned per request with
+    ``?page_size=``. Small clients can opt out with ``?paginate=false``.
+    Search results (``?q=``) are paged in order of relevance instead.
+    """
+    ordering = ('created_on', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    opt_out_query_param = 'paginate'
+
+    def get_ordering(self, request, queryset, view):
+        if RANK_FIELD in queryset.query.annotations:
+            return ('-' + RANK_FIELD,) + self.ordering
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.opt_out_query_param, '').lower() in ('false', '0', 'no'):
+            return None
+        return super().paginate_queryset(queryset, request, view)
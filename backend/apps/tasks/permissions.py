@@ -1,8 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission
 
+ADMIN_GROUP = 'Admin'
+AUTH_PROFILE_KEY = 'auth:profile:{user_id}'
+
+
+def authorization_profile(user):
+    """
+    The user's group names, permissions and admin flag.
+
+    The profile is memoised on the user object, which lives for one request, and
+    in the shared cache; group and permission signals invalidate the cached entry.
+    """
+    if user.pk is None:
+        return {'groups': [], 'permissions': [], 'is_admin': False}
+    if not hasattr(user, '_authorization_profile'):
+        key = AUTH_PROFILE_KEY.format(user_id=user.pk)
+        profile = cache.get(key)
+        if profile is None:
+            groups = sorted(user.groups.values_list('name', flat=True))
+            profile = {
+                'groups': groups,
+                'permissions': sorted(user.get_all_permissions()),
+                'is_admin': ADMIN_GROUP in groups,
+            }
+            cache.set(key, profile, timeout=settings.ROLE_CACHE_TIMEOUT)
+        user._authorization_profile = profile
+    return user._authorization_profile
+
+
 def is_admin(user):
     """Checks if a user is an admin."""
-    return user.groups.filter(name='Admin').exists()
+    # Users authenticated from token claims (apps.users.authentication) carry the flag
+    token_is_admin = getattr(user, 'token_is_admin', None)
+    if token_is_admin is not None:
+        return token_is_admin
+    return authorization_profile(user)['is_admin']
+
+
+def forget_roles(user_ids):
+    """Drops the cached authorization profile of the given users."""
+    cache.delete_many([AUTH_PROFILE_KEY.format(user_id=user_id) for user_id in user_ids])
 
 
 class IsAdminUser(BasePermission):
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; JSONRenderer is used without it
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson, several times faster on large task lists."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_encoder.default)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encoder.default)
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default).decode()
+    return json.dumps(data, cls=JSONEncoder)
+
+
+def _chunked(records, chunk_size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders a list of flat dicts as CSV. Exports go through ``stream()``, which
+    yields one block of text per ``chunk_size`` records.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        records = data if isinstance(data, list) else [data]
+        header = list(records[0]) if records else []
+        return ''.join(self.stream(records, header)).encode()
+
+    def stream(self, records, header, chunk_size=1000):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=header, extrasaction='ignore')
+        writer.writeheader()
+        for chunk in _chunked(records, chunk_size):
+            writer.writerows(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Renders one JSON document per line. Exports go through ``stream()``, like CSVRenderer."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        records = data if isinstance(data, list) else [data]
+        return ''.join(self.stream(records)).encode()
+
+    def stream(self, records, header=None, chunk_size=1000):
+        for chunk in _chunked(records, chunk_size):
+            yield ''.join(_dumps(record) + '\n' for record in chunk)
+
+
+def task_renderer_classes(defaults):
+    """The default renderers, with JSON rendered by orjson when it is installed, plus MessagePack."""
+    renderers = [ORJSONRenderer if orjson is not None and renderer is JSONRenderer else renderer
+                 for renderer in defaults]
+    return renderers + [MessagePackRenderer]
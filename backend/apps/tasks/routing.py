@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import TaskConsumer
+
+websocket_urlpatterns = [
+    path('ws/tasks/', TaskConsumer.as_asgi()),
+]
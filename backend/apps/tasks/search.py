@@ -0,0 +1,52 @@
+from functools import reduce
+from operator import and_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+# Text search configuration used by the search_vector trigger (migration 0004).
+SEARCH_CONFIG = 'english'
+# Name of the relevance annotation; TaskCursorPagination orders by it when present.
+RANK_FIELD = 'search_rank'
+
+
+def _rank_first(queryset, rank):
+    # ts_rank returns a float4, which the cursor would read back as a rounded double and
+    # then compare against the float4 again, skipping or repeating rows at page edges.
+    # Casting to double precision makes the value the cursor encodes the exact sort key.
+    return queryset.annotate(**{RANK_FIELD: Cast(rank, FloatField())}).order_by('-' + RANK_FIELD, *queryset.query.order_by)
+
+
+def search_tasks(queryset, text):
+    """
+    Filters ``queryset`` to the tasks matching ``text`` and annotates their relevance
+    as ``search_rank``, best matches first. On PostgreSQL this is a web-search style query (quoted phrases,
+    ``or``, ``-word``) over the GIN-indexed ``search_vector``; other databases fall back
+    to case-insensitive substring matching of every word, ranking title matches first.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return _rank_first(queryset.filter(search_vector=query), SearchRank(F('search_vector'), query))
+
+    words = text.split()
+    matches = [Q(title__icontains=word) | Q(description__icontains=word) for word in words]
+    title_matches = [Q(title__icontains=word) for word in words]
+    return _rank_first(queryset.filter(reduce(and_, matches)), Case(
+        When(reduce(and_, title_matches), then=Value(1.0)),
+        default=Value(0.5),
+        output_field=FloatField(),
+    ))
+
+
+class TaskSearchFilter(BaseFilterBackend):
+    """Applies ``?q=`` full-text search and annotates each task with its rank."""
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_tasks(queryset, text)
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Task
+from .models import PriorityEnum, Task, TaskStatus
+
+PRIORITY_LABELS = dict(PriorityEnum.choices())
+STATUS_LABELS = dict(TaskStatus.choices())
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -12,13 +19,119 @@ class TaskSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['created_by', 'created_on']
 
     def validate_title(self, value):
         request = self.context.get('request')
         if request and request.method == 'POST':
             user = request.user
-            if Task.objects.filter(title__iexact=value, created_by=user).exists():
+            # Compare LOWER(title) rather than using __iexact so task_title_lower_idx is used
+            duplicates = Task.objects.annotate(title_lower=Lower('title')).filter(
+                title_lower=Lower(Value(value)), created_by=user
+            )
+            if duplicates.exists():
                 raise serializers.ValidationError("You already have a task with this title.")
         return value
+
+
+class TaskBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Validates one item of a bulk request. The assignee is taken as a plain id and
+    titles are not checked here, so validating a batch costs no queries;
+    TaskService checks assignees and title uniqueness for the whole batch at once.
+    """
+    id = serializers.IntegerField(required=False)
+    assigned_to = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'description', 'due_date', 'priority', 'status', 'assigned_to']
+
+
+def datetime_converter():
+    """
+    Returns a converter with the same output as DRF's DateTimeField in its default
+    ISO 8601 format. The current timezone is looked up once, not once per value.
+    """
+    current = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def to_representation(value):
+        if current is not None:
+            value = value.astimezone(current) if timezone.is_aware(value) else timezone.make_aware(value, current)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    return to_representation
+
+
+class TaskListSerializer:
+    """
+    Read-only fast path for task lists. Builds the same dicts as TaskSerializer
+    straight from ``.values()`` rows, without model instances or per-field DRF
+    machinery. ``fields`` restricts the output to a sparse fieldset.
+    """
+    # Output field -> column read with .values(), in TaskSerializer's field order
+    COLUMNS = {
+        'id': 'id',
+        'priority_label': 'priority',
+        'status_label': 'status',
+        'assigned_to_username': 'assigned_to__username',
+        'created_by_username': 'created_by__username',
+        'title': 'title',
+        'description': 'description',
+        'due_date': 'due_date',
+        'priority': 'priority',
+        'status': 'status',
+        'created_on': 'created_on',
+        'updated_at': 'updated_at',
+        'created_by': 'created_by_id',
+        'assigned_to': 'assigned_to_id',
+    }
+    CONVERTERS = {
+        'priority_label': PRIORITY_LABELS.get,
+        'status_label': STATUS_LABELS.get,
+        'due_date': serializers.DateField().to_representation,
+        'created_on': datetime_converter,
+        'updated_at': datetime_converter,
+    }
+    # Converters that depend on the active timezone are built per call to many()
+    CONVERTER_FACTORIES = {datetime_converter}
+
+    def __init__(self, fields=None):
+        names = list(self.COLUMNS) if fields is None else list(dict.fromkeys(fields))
+        unknown = [name for name in names if name not in self.COLUMNS]
+        if unknown:
+            raise serializers.ValidationError({'fields': [f"Unknown field: {name}." for name in unknown]})
+        self.fields = [(name, self.COLUMNS[name], self.CONVERTERS.get(name)) for name in names]
+
+    def columns(self, extra=()):
+        """The columns to pass to ``.values()``; ``extra`` adds e.g. pagination ordering."""
+        return list(dict.fromkeys([column for _, column, _ in self.fields] + list(extra)))
+
+    def _bound_fields(self):
+        built = {factory: factory() for factory in self.CONVERTER_FACTORIES}
+        return [(name, column, built.get(convert, convert)) for name, column, convert in self.fields]
+
+    @staticmethod
+    def _represent(row, fields):
+        return {
+            name: row[column] if convert is None or row[column] is None else convert(row[column])
+            for name, column, convert in fields
+        }
+
+    def to_representation(self, row):
+        return self._represent(row, self._bound_fields())
+
+    def many(self, rows):
+        return list(self.iterate(rows))
+
+    def iterate(self, rows):
+        """Lazily converts ``rows``, so a streamed export never holds more than one row."""
+        fields = self._bound_fields()
+        for row in rows:
+            yield self._represent(row, fields)
+
+    @property
+    def names(self):
+        return [name for name, _, _ in self.fields]
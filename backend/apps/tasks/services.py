@@ -1,22 +1,60 @@
-from datetime import datetime
-from django.db.models import Count, Q
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
-from .models import Task, TaskStatus, PriorityEnum
+from django.utils import timezone
+
+from core.db_router import pin_to_primary
+
+from . import broadcast, cache, counters
+from .models import Task, TaskStatus, TaskTombstone, PriorityEnum
 from .permissions import is_admin
 
 
+# Accepted spellings of priority/status values in imported files, matched case-insensitively
+IMPORT_PRIORITIES = {priority.value.lower(): priority.value for priority in PriorityEnum}
+IMPORT_STATUSES = {status.value.lower(): status.value for status in TaskStatus}
+# Imports read the assignee's username; exports write it as assigned_to_username
+IMPORT_ASSIGNEE_COLUMNS = ('assigned_to_username', 'assigned_to')
+TITLE_MAX_LENGTH = Task._meta.get_field('title').max_length
+
+
+# Columns TaskSerializer renders; the related usernames come from the same JOIN.
+TASK_LIST_FIELDS = (
+    'id', 'title', 'description', 'due_date', 'priority', 'status', 'created_on', 'updated_at',
+    'created_by__id', 'created_by__username', 'assigned_to__id', 'assigned_to__username',
+)
+
+
 class TaskService:
     @staticmethod
     def get_tasks_for_user(user: User):
         if is_admin(user):
-            return Task.objects.all()
-        return Task.objects.filter(Q(created_by=user) | Q(assigned_to=user)).order_by('created_on')
+            return Task.objects.order_by('created_on', 'id')
+        return Task.objects.filter(Q(created_by=user) | Q(assigned_to=user)).order_by('created_on', 'id')
+
+    @staticmethod
+    def shape_for_serialization(queryset):
+        """
+        Fetches the creator and assignee in the same query and loads only the
+        columns the serializer reads, so listing N tasks costs a constant number of queries.
+        """
+        return queryset.select_related('created_by', 'assigned_to').only(*TASK_LIST_FIELDS)
 
     @staticmethod
     def create_task(user: User, title: str, **kwargs):
         if Task.objects.filter(title=title, created_by=user).exists():
             raise ValueError("You already created a task with this title.")
-        return Task.objects.create(created_by=user, title=title, **kwargs)
+        # The counters are updated by signal receivers; one transaction keeps them in step with the task.
+        with transaction.atomic():
+            task = Task.objects.create(created_by=user, title=title, **kwargs)
+        pin_to_primary(user.pk)
+        return task
 
     @staticmethod
     def update_task(task: Task, user: User, **kwargs):
@@ -34,34 +72,355 @@ class TaskService:
         if 'title' in kwargs and Task.objects.filter(title=kwargs['title'], created_by=user).exclude(pk=task.pk).exists():
             raise ValueError("You already have another task with this title.")
 
-        task.save()
+        with transaction.atomic():
+            task.save()
+        pin_to_primary(user.pk)
         return task
 
     @staticmethod
-    def delete_task(task: Task):
-        task.delete()
+    def update_statuses(updates: dict, user: User):
+        """
+        Sets the status of many tasks at once, given as ``{task_id: status}``.
+        Returns the updated tasks; ids that do not exist or that the user cannot see are skipped.
+        """
+        queryset = TaskService.get_tasks_for_user(user).filter(id__in=updates)
+        tasks = list(TaskService.shape_for_serialization(queryset))
+        now = timezone.now()
+        for task in tasks:
+            task.status = updates[task.id]
+            task.updated_at = now
+        with transaction.atomic():
+            previous_states = counters.current_states([task.id for task in tasks])
+            Task.objects.bulk_update(tasks, ['status', 'updated_at'])
+            TaskService._after_bulk_write(tasks, previous_states=previous_states, fields=['status'])
+        # Also called over the websocket, where no request middleware pins the user
+        pin_to_primary(user.pk)
+        return tasks
+
+    @staticmethod
+    def bulk_create_tasks(user: User, items: dict):
+        """
+        Creates many tasks for ``user`` in one transaction. ``items`` maps the index of
+        each item in the request to its validated data. Returns the created tasks and
+        ``{index: errors}`` for the items that were rejected.
+        """
+        assignees, errors = TaskService._resolve_assignees(items)
+        errors.update(TaskService._title_conflicts(
+            user, {index: data['title'] for index, data in items.items() if index not in errors}
+        ))
+
+        tasks = []
+        for index, data in items.items():
+            if index in errors:
+                continue
+            fields = {key: value for key, value in data.items() if key not in ('id', 'assigned_to')}
+            tasks.append(Task(created_by=user, assigned_to=assignees.get(data.get('assigned_to')), **fields))
+
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks, batch_size=settings.TASK_BULK_BATCH_SIZE)
+            TaskService._after_bulk_write(tasks)
+        pin_to_primary(user.pk)
+        return tasks, errors
+
+    @staticmethod
+    def import_tasks(user: User, records, batch_size=None):
+        """
+        Creates tasks for ``user`` from an iterable of ``(line_number, record)`` pairs,
+        as produced by ``imports.read_records``. Records are consumed one batch at a
+        time and every batch is committed on its own, so the input can be arbitrarily
+        large. Returns the number of tasks created, the number of records rejected and
+        ``{line_number: errors}`` for the first TASK_IMPORT_MAX_ERRORS of them.
+        """
+        batch_size = batch_size or settings.TASK_IMPORT_BATCH_SIZE
+        records = iter(records)
+        created = rejected = 0
+        errors = {}
+        while batch := list(islice(records, batch_size)):
+            assignees = {TaskService._import_assignee(record) for _, record in batch if record is not None} - {None}
+            usernames = {
+                username: user_id if is_active else None
+                for username, user_id, is_active in
+                User.objects.filter(username__in=assignees).values_list('username', 'id', 'is_active')
+            } if assignees else {}
+            items, batch_errors = TaskService._validate_import_batch(batch, usernames)
+            batch_errors.update(TaskService._title_conflicts(
+                user, {line: data['title'] for line, data in items.items()}
+            ))
+            tasks = [Task(created_by=user, **data) for line, data in items.items() if line not in batch_errors]
+            with transaction.atomic():
+                Task.objects.bulk_create(tasks, batch_size=settings.TASK_BULK_BATCH_SIZE)
+                TaskService._after_bulk_write(tasks)
+            created += len(tasks)
+            rejected += len(batch_errors)
+            room = max(settings.TASK_IMPORT_MAX_ERRORS - len(errors), 0)
+            errors.update(islice(sorted(batch_errors.items()), room))
+        pin_to_primary(user.pk)
+        return created, rejected, errors
+
+    @staticmethod
+    def _import_assignee(record):
+        """The username an imported record assigns the task to, if any."""
+        return next(
+            (str(record[column]).strip() for column in IMPORT_ASSIGNEE_COLUMNS
+             if record.get(column) is not None and str(record[column]).strip()),
+            None,
+        )
+
+    @staticmethod
+    def _validate_import_batch(batch, usernames: dict):
+        """
+        Checks a batch of imported records with dictionary lookups only: no
+        serializer and no query per row. ``usernames`` maps the batch's assignees
+        to their ids, or to None if they are inactive. Returns the model fields of
+        the valid records and the errors of the others, both keyed by line number.
+        """
+        items = {}
+        errors = {}
+        for line, record in batch:
+            if record is None:
+                errors[line] = {'non_field_errors': ["Expected a JSON object."]}
+                continue
+            record = {key: '' if value is None else str(value).strip() for key, value in record.items() if key}
+            data = {'description': record.get('description', ''), 'title': record.get('title', '')}
+            row_errors = {}
+
+            if not data['title']:
+                row_errors['title'] = ["This field is required."]
+            elif len(data['title']) > TITLE_MAX_LENGTH:
+                row_errors['title'] = [f"Ensure this field has no more than {TITLE_MAX_LENGTH} characters."]
+
+            for field, choices in (('priority', IMPORT_PRIORITIES), ('status', IMPORT_STATUSES)):
+                value = record.get(field)
+                if value:
+                    if value.lower() in choices:
+                        data[field] = choices[value.lower()]
+                    else:
+                        row_errors[field] = [f"\"{value}\" is not a valid choice."]
+
+            if record.get('due_date'):
+                try:
+                    data['due_date'] = date.fromisoformat(record['due_date'])
+                except ValueError:
+                    row_errors['due_date'] = ["Date has wrong format. Use YYYY-MM-DD."]
+
+            username = TaskService._import_assignee(record)
+            if username is not None:
+                if usernames.get(username) is not None:
+                    data['assigned_to_id'] = usernames[username]
+                elif username in usernames:
+                    row_errors['assigned_to'] = [f"User \"{username}\" is inactive."]
+                else:
+                    row_errors['assigned_to'] = [f"Unknown user \"{username}\"."]
+
+            if row_errors:
+                errors[line] = row_errors
+            else:
+                items[line] = data
+        return items, errors
+
+    @staticmethod
+    def bulk_update_tasks(user: User, items: dict):
+        """
+        Updates many tasks in one transaction, following the same rules as update_task:
+        only superusers may change fields other than ``status``. Each item carries the
+        task ``id``; tasks the user cannot see are reported as not found.
+        """
+        queryset = TaskService.get_tasks_for_user(user).filter(id__in={data['id'] for data in items.values()})
+        tasks = TaskService.shape_for_serialization(queryset).in_bulk()
+
+        errors = {}
+        changes = {}
+        seen = set()
+        for index, data in items.items():
+            if data['id'] not in tasks:
+                errors[index] = {'id': ["Task not found."]}
+                continue
+            if data['id'] in seen:
+                errors[index] = {'id': ["This task appears more than once in the request."]}
+                continue
+            seen.add(data['id'])
+            if not user.is_superuser:
+                data = {key: value for key, value in data.items() if key in ('id', 'status')}
+            changes[index] = data
 
-    def get_dashboard_data(user: User, tasks_filter):
-        total_tasks = tasks_filter.count()
+        assignees, assignee_errors = TaskService._resolve_assignees(changes)
+        errors.update(assignee_errors)
+        # Only the tasks that will really be renamed give up their current title
+        titles = {index: data['title'] for index, data in changes.items() if 'title' in data and index not in errors}
+        errors.update(TaskService._title_conflicts(
+            user, titles, exclude_ids=[changes[index]['id'] for index in titles],
+        ))
+
+        updated = []
+        fields = {'updated_at'}
+        previous_assignees = {}
+        now = timezone.now()
+        for index, data in changes.items():
+            if index in errors:
+                continue
+            task = tasks[data['id']]
+            previous_assignees[task.id] = task.assigned_to_id
+            task.updated_at = now
+            for key, value in data.items():
+                if key == 'id':
+                    continue
+                if key == 'assigned_to':
+                    value = assignees.get(value)
+                setattr(task, key, value)
+                fields.add(key)
+            updated.append(task)
+
+        with transaction.atomic():
+            previous_states = counters.current_states([task.id for task in updated])
+            Task.objects.bulk_update(updated, fields, batch_size=settings.TASK_BULK_BATCH_SIZE)
+            TaskService._after_bulk_write(updated, previous_assignees, previous_states, fields)
+        pin_to_primary(user.pk)
+        return updated, errors
+
+    @staticmethod
+    def bulk_delete_tasks(user: User, ids):
+        """
+        Deletes the given tasks the user can see; returns the deleted ids and the missing ones.
+        The rows are deleted with one statement, without post_delete, and the receivers'
+        work (tombstones, counters, cache versions) is done once for the whole batch.
+        """
+        visible = TaskService.get_tasks_for_user(user).filter(id__in=ids).order_by().values('id')
+        with transaction.atomic():
+            # Locks the rows, so the counters subtract what they are now
+            states = counters.current_states(visible)
+            TaskService._delete_rows(list(states))
+            TaskTombstone.objects.bulk_create([
+                TaskTombstone(task_id=task_id, created_by_id=created_by_id, assigned_to_id=assigned_to_id)
+                for task_id, (created_by_id, assigned_to_id, *_) in states.items()
+            ])
+            counters.tasks_changed([(state, None) for state in states.values()])
+            cache.tasks_changed(list(states), [user_id for state in states.values() for user_id in state[:2]])
+        pin_to_primary(user.pk)
+        return set(states), [task_id for task_id in ids if task_id not in states]
 
-        tasks_by_status = tasks_filter.values('status').annotate(count=Count('id')).order_by('status')
-        status_dict = {status['status']: status['count'] for status in tasks_by_status}
-        all_statuses = {status.value: 0 for status in TaskStatus}
-        all_statuses.update(status_dict)
+    @staticmethod
+    def _delete_rows(task_ids):
+        """
+        Deletes the tasks with a single DELETE. QuerySet.delete() would load every row and
+        send pre_delete/post_delete per task, which is exactly the per-row work the bulk
+        delete does once for the batch. Skipping the Collector is only safe while no model
+        references Task, since nothing would cascade; a new relation must fail loudly here.
+        """
+        relations = [relation.name for relation in Task._meta.related_objects] + [
+            field.name for field in Task._meta.many_to_many
+        ]
+        if relations:
+            raise ImproperlyConfigured(
+                f"Task is referenced by {', '.join(relations)}; bulk_delete_tasks must cascade to them."
+            )
+        Task.objects.filter(id__in=task_ids)._raw_delete(router.db_for_write(Task))
 
-        tasks_filter_without_completed = tasks_filter.exclude(status=TaskStatus.COMPLETED.value)
-        tasks_by_priority = tasks_filter_without_completed.values('priority').annotate(count=Count('id')).order_by('priority')
-        priority_dict = {priority['priority']: priority['count'] for priority in tasks_by_priority}
-        all_priorities = {priority.value: 0 for priority in PriorityEnum}
-        all_priorities.update(priority_dict)
+    @staticmethod
+    def _resolve_assignees(items: dict):
+        """Looks up every assignee of a batch with one query."""
+        ids = {data['assigned_to'] for data in items.values() if data.get('assigned_to') is not None}
+        assignees = User.objects.only('id', 'username').in_bulk(ids) if ids else {}
+        errors = {
+            index: {'assigned_to': [f"Invalid pk \"{data['assigned_to']}\" - object does not exist."]}
+            for index, data in items.items()
+            if data.get('assigned_to') is not None and data['assigned_to'] not in assignees
+        }
+        return assignees, errors
 
-        tasks_due_today = tasks_filter.filter(due_date=datetime.today()).count()
-        tasks_assigned_to_user = tasks_filter.filter(assigned_to=user).count()
+    @staticmethod
+    def _title_conflicts(user: User, titles: dict, exclude_ids=()):
+        """
+        Finds titles that clash, case-insensitively, with the user's other tasks or
+        with an earlier item of the same batch. One query for the whole batch.
+        """
+        if not titles:
+            return {}
+        taken = set(
+            Task.objects.filter(created_by=user).exclude(id__in=exclude_ids)
+            .annotate(title_lower=Lower('title'))
+            .filter(title_lower__in={title.lower() for title in titles.values()})
+            .values_list('title_lower', flat=True)
+        )
+        errors = {}
+        for index, title in titles.items():
+            if title.lower() in taken:
+                errors[index] = {'title': ["You already have a task with this title."]}
+            taken.add(title.lower())
+        return errors
+
+    @staticmethod
+    def get_changes(user: User, since):
+        """
+        Returns the tasks visible to ``user`` that changed at or after ``since`` and
+        the ids of tasks that have left the user's view since then.
+        """
+        changed = TaskService.get_tasks_for_user(user).filter(updated_at__gte=since)
+        tombstones = TaskTombstone.objects.filter(deleted_at__gte=since)
+        if is_admin(user):
+            tombstones = tombstones.filter(reason=TaskTombstone.DELETED)
+        else:
+            tombstones = tombstones.filter(Q(created_by_id=user.pk) | Q(assigned_to_id=user.pk))
+        return changed, set(tombstones.values_list('task_id', flat=True))
+
+    @staticmethod
+    def _after_bulk_write(tasks, previous_assignees=None, previous_states=None, fields=None):
+        # bulk_create() and bulk_update() do not send post_save, so do the signal
+        # receivers' work here: tombstones, counters, cache versions and the broadcast.
+        # Updates pass the counted states locked before the write (counters.current_states)
+        # and the fields they wrote; without them the tasks were just created.
+        previous_assignees = previous_assignees or {}
+        if previous_states is None:
+            counters.tasks_changed([(None, counters.counted_state(task)) for task in tasks])
+        else:
+            counters.tasks_changed([
+                (previous_states[task.id], counters.saved_state(task, previous_states[task.id], fields))
+                for task in tasks if task.id in previous_states
+            ])
+        TaskTombstone.objects.bulk_create([
+            TaskTombstone(task_id=task.id, reason=TaskTombstone.UNASSIGNED, assigned_to_id=previous_assignees[task.id])
+            for task in tasks
+            if previous_assignees.get(task.id) not in (None, task.assigned_to_id, task.created_by_id)
+        ])
+        cache.tasks_changed(
+            [task.id for task in tasks],
+            [task.created_by_id for task in tasks]
+            + [task.assigned_to_id for task in tasks]
+            + list(previous_assignees.values()),
+        )
+        broadcast.queue_task_broadcast([task.id for task in tasks], previous_assignees=previous_assignees)
+
+    @staticmethod
+    def delete_task(task: Task):
+        with transaction.atomic():
+            task.delete()
+
+    @staticmethod
+    def get_dashboard_data(user: User, admin: bool):
+        """Reads every dashboard figure from the user's materialized counters (apps.tasks.counters) in one query."""
+        counts = counters.dashboard_counts(user, admin)
+        all_statuses = {
+            status.value: counts.get(counters.STATUS_KEY.format(status=status.value), 0) for status in TaskStatus
+        }
+        all_priorities = {
+            priority.value: counts.get(counters.PRIORITY_KEY.format(priority=priority.value), 0)
+            for priority in PriorityEnum
+        }
 
         return {
-            'total_tasks': total_tasks,
+            'total_tasks': counts.get(counters.TOTAL, 0),
             'tasks_by_status': {status.replace("_", " ").title(): count for status, count in all_statuses.items()},
             'tasks_by_priority': {priority.replace("_", " ").title(): count for priority, count in all_priorities.items()},
-            'tasks_due_today': tasks_due_today,
-            'tasks_assigned_to_user': tasks_assigned_to_user,
+            'tasks_due_today': counts.get(counters.DUE_KEY.format(day=date.today()), 0),
+            'tasks_assigned_to_user': counts.get(counters.ASSIGNED, 0),
         }
+
+    @staticmethod
+    def get_cached_dashboard_data(user: User):
+        """Serves the dashboard from the per-user cache, computing it on a miss."""
+        admin = is_admin(user)
+        key = cache.dashboard_cache_key(user, admin)
+        data = cache.get_dashboard(key)
+        if data is None:
+            data = TaskService.get_dashboard_data(user, admin)
+            cache.set_dashboard(key, data, user, admin)
+        return data
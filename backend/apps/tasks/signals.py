@@ -1,21 +1,189 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
-from .models import Task
-from .serializers import TaskSerializer
+from ..users import denylist
+from . import counters
+from .broadcast import queue_task_broadcast
+from .cache import tasks_changed
+from .models import Task, TaskCounter, TaskTombstone
+from .permissions import ADMIN_GROUP, forget_roles
+
+
+@receiver(post_init, sender=Task)
+def remember_loaded_assignee(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred assigned_to_id is not fetched just for this.
+    instance._loaded_assigned_to_id = instance.__dict__.get('assigned_to_id')
+
+
+@receiver(pre_save, sender=Task)
+@receiver(pre_delete, sender=Task)
+def lock_counted_state(sender, instance, **kwargs):
+    # The row as it is now, not as it was loaded: another write may have changed it since.
+    # TaskService saves and deletes in a transaction, so the row stays locked until the counters are updated.
+    if not instance._state.adding:
+        instance._counted_state = counters.current_states([instance.pk]).get(instance.pk)
 
 
 @receiver(post_save, sender=Task)
 def broadcast_task_update(sender, instance, created, **kwargs):
-    channel_layer = get_channel_layer()
-    task_data = TaskSerializer(instance).data
-
-    async_to_sync(channel_layer.group_send)(
-        'tasks_updates',
-        {
-            'type': 'task_update',
-            'task_data': task_data
-        }
+    # Sent once the transaction commits, together with the other tasks it saved.
+    queue_task_broadcast(
+        [instance.pk],
+        previous_assignees={instance.pk: getattr(instance, '_loaded_assigned_to_id', None)},
+    )
+
+
+@receiver(post_save, sender=Task)
+def record_task_unassignment(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_assigned_to_id', None)
+    if not created and previous is not None and previous not in (instance.assigned_to_id, instance.created_by_id):
+        TaskTombstone.objects.create(task_id=instance.pk, reason=TaskTombstone.UNASSIGNED, assigned_to_id=previous)
+
+
+@receiver(post_delete, sender=Task)
+def record_task_deletion(sender, instance, **kwargs):
+    TaskTombstone.objects.create(
+        task_id=instance.pk,
+        created_by_id=instance.created_by_id,
+        assigned_to_id=instance.assigned_to_id,
     )
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def bump_task_versions(sender, instance, **kwargs):
+    tasks_changed([instance.pk], [
+        instance.created_by_id,
+        instance.assigned_to_id,
+        getattr(instance, '_loaded_assigned_to_id', None),
+    ])
+
+
+@receiver(post_save, sender=Task)
+def update_task_counters(sender, instance, created, update_fields=None, **kwargs):
+    old = None if created else getattr(instance, '_counted_state', None)
+    counters.tasks_changed([(old, counters.saved_state(instance, old, update_fields))])
+
+
+@receiver(post_delete, sender=Task)
+def discount_deleted_task(sender, instance, **kwargs):
+    counters.tasks_changed([(getattr(instance, '_counted_state', None), None)])
+
+
+# Must stay the last Task post_save receiver: the ones above read the previous assignee.
+@receiver(post_save, sender=Task)
+def reset_loaded_assignee(sender, instance, **kwargs):
+    instance._loaded_assigned_to_id = instance.assigned_to_id
+
+
+@receiver(post_delete, sender=User)
+def drop_user_task_counters(sender, instance, **kwargs):
+    # Their tasks are gone or unassigned by now; unassigning sends no signal.
+    TaskCounter.objects.filter(user_id=instance.pk).delete()
+
+
+def _members(group_ids):
+    return User.objects.filter(groups__in=group_ids).values_list('pk', flat=True).distinct()
+
+
+def _forget_roles(user_ids):
+    # Once the change commits: until then a concurrent request still reads, and would
+    # cache again, the old roles.
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(partial(forget_roles, user_ids))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_roles_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear(): pk_set is not provided, so read the members before they go
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # user.groups.add(...) / user.user_permissions.remove(...) / clear
+        instance.__dict__.pop('_authorization_profile', None)
+        _forget_roles([instance.pk])
+    elif action == 'post_clear':
+        _forget_roles(instance.__dict__.pop('_cleared_user_ids', []))
+    else:
+        _forget_roles(pk_set)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_roles_on_group_permission_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # permission.group_set.clear(): read the groups' members before they lose it
+        instance._cleared_user_ids = list(_members(instance.group_set.values_list('pk', flat=True)))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # group.permissions.add(...) / remove / clear
+        _forget_roles(_members([instance.pk]))
+    elif action == 'post_clear':
+        _forget_roles(instance.__dict__.pop('_cleared_user_ids', []))
+    else:
+        _forget_roles(_members(pk_set))
+
+
+@receiver(post_save, sender=User)
+def invalidate_roles_on_user_change(sender, instance, created, update_fields=None, **kwargs):
+    # is_superuser and is_active change the user's permissions; logins only touch last_login.
+    if created or (update_fields is not None and set(update_fields) == {'last_login'}):
+        return
+    instance.__dict__.pop('_authorization_profile', None)
+    _forget_roles([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_roles_on_group_change(sender, instance, **kwargs):
+    # Renaming or deleting a group changes its members' roles without an m2m signal.
+    # Before a delete the members are still there to read.
+    if kwargs.get('created'):
+        return
+    _forget_roles(instance.user_set.values_list('pk', flat=True))
+
+
+def _revoke_tokens(user_ids):
+    # Access tokens carry the admin flag (apps.users.tokens). Revoked once the change
+    # commits, so a token refreshed in the meantime cannot keep the old flag.
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(partial(denylist.revoke_users, user_ids))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def revoke_tokens_on_admin_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        # user.groups.add(...) / remove / clear
+        groups = instance.groups.all() if action == 'pre_clear' else Group.objects.filter(pk__in=pk_set)
+        if groups.filter(name=ADMIN_GROUP).exists():
+            _revoke_tokens([instance.pk])
+    elif instance.name == ADMIN_GROUP:
+        # admin_group.user_set.add(...) / remove / clear
+        _revoke_tokens(instance.user_set.values_list('pk', flat=True) if action == 'pre_clear' else pk_set)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def revoke_tokens_on_admin_group_change(sender, instance, signal, **kwargs):
+    # Deleting the Admin group, or renaming a group to or from it, changes who is an admin.
+    if instance._state.adding:
+        return
+    names = {instance.name}
+    if signal is pre_save:
+        names.add(Group.objects.filter(pk=instance.pk).values_list('name', flat=True).first())
+        if len(names) == 1:
+            return
+    if ADMIN_GROUP in names:
+        _revoke_tokens(instance.user_set.values_list('pk', flat=True))
+
@@ -1 +1,1293 @@
-# Create your tests here.
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+import msgpack
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.contrib.auth.models import AnonymousUser, Group, Permission, User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, router, transaction
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, Lower
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core.caching import TAG_KEY, metrics, reset_metrics
+from core.db_router import PRIMARY, ReplicaRoutingMiddleware, RequestRouting, may_be_stale, read_database
+
+from . import broadcast, counters
+from .broadcast import ADMIN_GROUP, user_group
+from .cache import TASK_TAG, collection_version, tasks_changed
+from .consumers import TaskConsumer
+from .filters import TaskFilter
+from .models import PriorityEnum, Task, TaskCounter, TaskStatus, TaskTombstone
+from .permissions import authorization_profile, is_admin
+from .search import RANK_FIELD, search_tasks
+from .serializers import TaskSerializer
+from .services import TaskService
+from .views import TaskViewSet, _iterate_in_thread
+
+
+class RecordingChannelLayer(InMemoryChannelLayer):
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+
+class TaskListPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.client.force_authenticate(self.user)
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', created_by=self.user) for i in range(5)
+        ])
+
+    def test_list_is_cursor_paginated(self):
+        response = self.client.get(reverse('tasks-list'), {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_pages_cover_every_task_once(self):
+        seen = []
+        url = reverse('tasks-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(Task.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_admin_listing_is_ordered(self):
+        admin = User.objects.create_user(username='admin', password='pass')
+        admin.groups.add(Group.objects.create(name='Admin'))
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('tasks-list'))
+        ids = [task['id'] for task in response.data['results']]
+        self.assertEqual(ids, sorted(ids))
+
+    def test_opt_out_returns_plain_list(self):
+        response = self.client.get(reverse('tasks-list'), {'paginate': 'false'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 5)
+
+
+class TaskListQueryCountTests(APITestCase):
+    """Guards the list endpoint against N+1 regressions on the related users."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.assignee = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+
+    def seed(self, count):
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', created_by=self.user, assigned_to=self.assignee)
+            for i in range(Task.objects.count(), Task.objects.count() + count)
+        ])
+        # bulk_create() sends no signals; invalidate the cached lists as TaskService does
+        tasks_changed([], [self.user.pk, self.assignee.pk])
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('tasks-list'), {'paginate': 'false'})
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_query_count_is_independent_of_row_count(self):
+        self.count_list_queries()  # warms the user's cached authorization profile
+        self.seed(2)
+        small, _ = self.count_list_queries()
+        self.seed(40)
+        large, response = self.count_list_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data), 42)
+
+    def test_usernames_come_from_the_joined_query(self):
+        self.seed(3)
+        _, response = self.count_list_queries()
+        self.assertEqual(
+            {(task['created_by_username'], task['assigned_to_username']) for task in response.data},
+            {('alice', 'bob')},
+        )
+
+
+class TaskIndexUsageTests(TestCase):
+    """Checks the query plan of each hot Task query against a seeded table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create([User(username=f'user{i}') for i in range(20)])
+        statuses = [status.value for status in TaskStatus]
+        priorities = [priority.value for priority in PriorityEnum]
+        today = date.today()
+        Task.objects.bulk_create([
+            Task(
+                title=f'Task {i}',
+                created_by=cls.users[i % 20],
+                assigned_to=cls.users[(i * 7) % 20] if i % 3 else None,
+                status=statuses[i % len(statuses)],
+                priority=priorities[i % len(priorities)],
+                due_date=today + timedelta(days=i % 60) if i % 4 == 0 else None,
+            )
+            for i in range(2000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # The seeded table is still small enough for the planner to prefer a seq scan.
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = queryset.explain()
+        for index_name in index_names:
+            self.assertIn(index_name, plan)
+
+    def test_visibility_filter(self):
+        queryset = TaskService.get_tasks_for_user(self.users[0])
+        self.assertUsesIndex(queryset, 'task_owner_created_idx', 'task_assignee_created_idx')
+
+    def test_status_filter(self):
+        self.assertUsesIndex(Task.objects.filter(status=TaskStatus.PENDING.value), 'task_status_due_idx')
+
+    def test_priority_filter(self):
+        self.assertUsesIndex(Task.objects.filter(priority=PriorityEnum.HIGH.value), 'task_priority_due_idx')
+
+    def test_due_date_filter(self):
+        self.assertUsesIndex(Task.objects.filter(due_date__lte=date.today()), 'task_due_date_idx')
+
+    def test_due_today(self):
+        self.assertUsesIndex(Task.objects.filter(due_date=date.today()), 'task_due_date_idx')
+
+    def filtered(self, **params):
+        return TaskFilter(params, queryset=Task.objects.all()).qs
+
+    def test_status_in_filter(self):
+        queryset = self.filtered(status__in=f'{TaskStatus.PENDING.value},{TaskStatus.ON_HOLD.value}')
+        self.assertUsesIndex(queryset, 'task_status_due_idx')
+
+    def test_overdue_filter(self):
+        self.assertUsesIndex(self.filtered(overdue='true'), 'task_status_due_idx')
+
+    def test_due_date_range_filter(self):
+        queryset = self.filtered(due_date__gte=str(date.today()), due_date__lte=str(date.today() + timedelta(days=7)))
+        self.assertUsesIndex(queryset, 'task_due_date_idx')
+
+    def test_created_on_range_filter(self):
+        self.assertUsesIndex(self.filtered(created_on__gte=timezone.now().isoformat()), 'task_created_idx')
+
+    def test_unassigned_filter(self):
+        self.assertUsesIndex(self.filtered(unassigned='true'), 'task_assignee_created_idx')
+
+    def test_duplicate_title_check(self):
+        queryset = Task.objects.annotate(title_lower=Lower('title')).filter(
+            title_lower=Lower(Value('TASK 1')), created_by=self.users[1]
+        )
+        self.assertUsesIndex(queryset, 'task_title_lower_idx')
+
+
+class DashboardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        Task.objects.create(title='Due', created_by=self.user, due_date=date.today(),
+                            priority=PriorityEnum.HIGH.value)
+        Task.objects.create(title='Done', created_by=self.user, status=TaskStatus.COMPLETED.value,
+                            priority=PriorityEnum.HIGH.value)
+        Task.objects.create(title='Mine', created_by=self.other, assigned_to=self.user)
+        Task.objects.create(title='Hidden', created_by=self.other)
+
+    def test_payload(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.data, {
+            'total_tasks': 3,
+            'tasks_by_status': {'Not Started': 2, 'In Progress': 0, 'Pending': 0, 'On Hold': 0, 'Completed': 1},
+            'tasks_by_priority': {'Low': 1, 'Medium': 0, 'High': 1},
+            'tasks_due_today': 1,
+            'tasks_assigned_to_user': 1,
+        })
+
+    def test_reads_counters_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = TaskService.get_dashboard_data(self.user, admin=False)
+        self.assertEqual(data['total_tasks'], 3)
+        self.assertEqual(TaskService.get_dashboard_data(self.user, admin=True)['total_tasks'], 4)
+
+    def test_cached_until_a_visible_task_changes(self):
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('dashboard'))
+        self.assertFalse([q for q in context.captured_queries if Task._meta.db_table in q['sql']])
+
+        Task.objects.create(title='New', created_by=self.user)
+        self.assertEqual(self.client.get(reverse('dashboard')).data['total_tasks'], 4)
+
+    def test_reassignment_invalidates_previous_assignee(self):
+        self.assertEqual(self.client.get(reverse('dashboard')).data['tasks_assigned_to_user'], 1)
+        task = Task.objects.get(title='Mine')
+        task.assigned_to = None
+        task.save()
+        self.assertEqual(self.client.get(reverse('dashboard')).data['tasks_assigned_to_user'], 0)
+
+
+class AdminRoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(name='Admin')
+        self.user = User.objects.create_user(username='alice', password='pass')
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_steady_state_costs_no_queries(self):
+        is_admin(self.fresh_user())
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertFalse(is_admin(user))
+            self.assertFalse(is_admin(user))
+
+    def test_adding_user_to_group_invalidates(self):
+        self.assertFalse(is_admin(self.user))
+        # Cached roles are dropped once the change commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.group)
+            self.assertFalse(is_admin(self.fresh_user()))
+        self.assertTrue(is_admin(self.user))
+        self.assertTrue(is_admin(self.fresh_user()))
+
+    def test_reverse_membership_changes_invalidate(self):
+        self.assertFalse(is_admin(self.fresh_user()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.user_set.add(self.user)
+        self.assertTrue(is_admin(self.fresh_user()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.user_set.clear()
+        self.assertFalse(is_admin(self.fresh_user()))
+
+    def test_renaming_group_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(self.group)
+        self.assertTrue(is_admin(self.fresh_user()))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.name = 'Former Admin'
+            self.group.save()
+        self.assertFalse(is_admin(self.fresh_user()))
+
+
+class AuthorizationProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(name='Editors')
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.user.groups.add(self.group)
+        self.permission = Permission.objects.get(codename='change_task')
+
+    def profile(self):
+        return authorization_profile(User.objects.get(pk=self.user.pk))
+
+    def test_profile_is_cached(self):
+        self.assertEqual(self.profile(), {'groups': ['Editors'], 'permissions': [], 'is_admin': False})
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            authorization_profile(user)
+
+    def test_user_permission_changes_invalidate(self):
+        self.profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.user_permissions.add(self.permission)
+        self.assertEqual(self.profile()['permissions'], ['tasks.change_task'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.user_set.remove(self.user)
+        self.assertEqual(self.profile()['permissions'], [])
+
+    def test_group_permission_changes_invalidate(self):
+        self.profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.group.permissions.add(self.permission)
+        self.assertEqual(self.profile()['permissions'], ['tasks.change_task'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.group_set.clear()
+        self.assertEqual(self.profile()['permissions'], [])
+
+    def test_superuser_flag_invalidates(self):
+        self.profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_superuser = True
+            self.user.save()
+        self.assertIn('tasks.change_task', self.profile()['permissions'])
+
+
+@override_settings(TASK_BROADCAST_IN_BACKGROUND=False)
+class TaskConsumerTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        broadcast._state.outboxes = {}
+        self.layer = RecordingChannelLayer()
+        patcher = mock.patch('apps.tasks.broadcast.get_channel_layer', return_value=self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        self.tasks = Task.objects.bulk_create([Task(title=f'Task {i}', created_by=self.user) for i in range(3)])
+        self.consumer = self.make_consumer(self.user)
+
+    def make_consumer(self, user):
+        consumer = TaskConsumer()
+        consumer.scope = {'user': user}
+        consumer.channel_layer = self.layer
+        consumer.channel_name = 'test-channel'
+        self.sent = []
+        self.closed = False
+
+        async def send(text_data):
+            self.sent.append(json.loads(text_data))
+
+        async def accept():
+            pass
+
+        async def close():
+            self.closed = True
+
+        consumer.send = send
+        consumer.accept = accept
+        consumer.close = close
+        async_to_sync(consumer.connect)()
+        return consumer
+
+    def receive(self, message):
+        async_to_sync(self.consumer.receive)(text_data=json.dumps(message))
+        return self.sent[-1]
+
+    def test_connect_subscribes_to_own_group(self):
+        self.assertEqual(self.consumer.room_group_name, user_group(self.user.pk))
+
+    def test_admins_subscribe_to_admin_group(self):
+        self.other.groups.add(Group.objects.create(name='Admin'))
+        consumer = self.make_consumer(self.other)
+        self.assertEqual(consumer.room_group_name, ADMIN_GROUP)
+
+    def test_anonymous_connection_is_closed(self):
+        self.make_consumer(AnonymousUser())
+        self.assertTrue(self.closed)
+
+    def test_batch_is_one_write_and_one_broadcast_per_group(self):
+        updates = [{'task_id': task.id, 'status': TaskStatus.IN_PROGRESS.value} for task in self.tasks]
+        reply = self.receive({'updates': updates + [{'task_id': 999999}, {'task_id': self.tasks[0].id, 'status': 'x'}]})
+
+        self.assertEqual(
+            {group: len(message['tasks_data']) for group, message in self.layer.sent},
+            {ADMIN_GROUP: 3, user_group(self.user.pk): 3},
+        )
+        self.assertEqual(
+            set(Task.objects.values_list('status', flat=True)), {TaskStatus.IN_PROGRESS.value}
+        )
+        self.assertEqual(
+            [(ack['task_id'], ack['ok']) for ack in reply['acks']],
+            [(self.tasks[0].id, False)] + [(task.id, True) for task in self.tasks] + [(999999, False)],
+        )
+
+    def test_invisible_tasks_are_not_updated(self):
+        hidden = Task.objects.create(title='Hidden', created_by=self.other)
+        reply = self.receive({'task_id': hidden.id})
+        self.assertEqual(reply['acks'], [{'task_id': hidden.id, 'ok': False, 'error': 'Task not found.'}])
+        self.assertEqual(Task.objects.get(pk=hidden.id).status, TaskStatus.NOT_STARTED.value)
+
+    def test_single_message_defaults_to_completed(self):
+        reply = self.receive({'task_id': self.tasks[0].id})
+        self.assertEqual(reply['acks'], [{'task_id': self.tasks[0].id, 'ok': True}])
+        self.assertEqual(Task.objects.get(pk=self.tasks[0].id).status, TaskStatus.COMPLETED.value)
+
+
+class UpdateStatusesTests(TestCase):
+    def test_one_read_and_one_write(self):
+        user = User.objects.create_user(username='alice', password='pass')
+        tasks = Task.objects.bulk_create([Task(title=f'Task {i}', created_by=user) for i in range(3)])
+        cache.clear()
+        is_admin(user)
+        # Plus, in one transaction, locking the rows and updating the counters (insert missing rows, update)
+        with self.assertNumQueries(7):
+            TaskService.update_statuses({task.id: TaskStatus.PENDING.value for task in tasks}, user=user)
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {TaskStatus.PENDING.value})
+
+
+@override_settings(TASK_BROADCAST_IN_BACKGROUND=False)
+class TaskBroadcastOutboxTests(TestCase):
+    def setUp(self):
+        # Ids other tests queued in transactions that were rolled back
+        broadcast._state.outboxes = {}
+        self.layer = RecordingChannelLayer()
+        patcher = mock.patch('apps.tasks.broadcast.get_channel_layer', return_value=self.layer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.assignee = User.objects.create_user(username='bob', password='pass')
+
+    def test_saves_are_coalesced_until_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Task.objects.create(title='First', created_by=self.user)
+            first.status = TaskStatus.PENDING.value
+            first.save()
+            Task.objects.create(title='Second', created_by=self.user)
+            self.assertEqual(self.layer.sent, [])
+
+        self.assertEqual(
+            {group: [task['title'] for task in message['tasks_data']] for group, message in self.layer.sent},
+            {ADMIN_GROUP: ['First', 'Second'], user_group(self.user.pk): ['First', 'Second']},
+        )
+
+    def test_rolled_back_saves_are_not_sent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Task.objects.create(title='Doomed', created_by=self.user)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            Task.objects.create(title='Kept', created_by=self.user)
+
+        titles = {task['title'] for _, message in self.layer.sent for task in message['tasks_data']}
+        self.assertEqual(titles, {'Kept'})
+
+    def test_previous_assignee_is_notified(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Moved', created_by=self.user, assigned_to=self.assignee)
+        task = Task.objects.get(pk=task.pk)
+        self.layer.sent.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assigned_to = None
+            task.save()
+        self.assertIn((user_group(self.assignee.pk), {'type': 'tasks_removed', 'task_ids': [task.pk]}),
+                      self.layer.sent)
+        self.assertEqual(
+            {group for group, message in self.layer.sent if message['type'] == 'tasks_update'},
+            {ADMIN_GROUP, user_group(self.user.pk)},
+        )
+
+    def test_rolled_back_reassignment_removes_nothing(self):
+        task = Task.objects.create(title='Stays', created_by=self.user, assigned_to=self.assignee)
+        try:
+            with transaction.atomic():
+                task.assigned_to = None
+                task.save()
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.layer.sent.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='Next', created_by=self.user)
+
+        self.assertNotIn('tasks_removed', [message['type'] for _, message in self.layer.sent])
+        self.assertEqual({task['title'] for message in dict(self.layer.sent).values() for task in message['tasks_data']},
+                         {'Stays', 'Next'})
+
+    def test_consumer_forwards_removed_ids(self):
+        consumer = TaskConsumer()
+        sent = []
+
+        async def send(text_data):
+            sent.append(json.loads(text_data))
+
+        consumer.send = send
+        async_to_sync(consumer.tasks_removed)({'type': 'tasks_removed', 'task_ids': [4, 7]})
+        self.assertEqual(sent, [{'removed_task_ids': [4, 7]}])
+
+
+class TaskBulkEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.assignee = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('tasks-bulk-create')
+
+    def test_bulk_create_reports_per_item_errors(self):
+        Task.objects.create(title='Existing', created_by=self.user)
+        response = self.client.post(self.url, [
+            {'title': 'One', 'assigned_to': self.assignee.pk},
+            {'title': 'existing'},
+            {'title': 'ONE'},
+            {'title': 'Two', 'assigned_to': 999999},
+            {'title': 'Three', 'priority': 'Urgent'},
+            {'title': 'Four', 'status': TaskStatus.PENDING.value},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([task['title'] for task in response.data['results']], ['One', 'Four'])
+        self.assertEqual(response.data['results'][0]['assigned_to_username'], 'bob')
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3, 4])
+        self.assertEqual(Task.objects.filter(created_by=self.user).count(), 3)
+
+    def test_bulk_create_query_count_is_constant(self):
+        def post(count, offset):
+            items = [{'title': f'Task {offset + i}', 'assigned_to': self.assignee.pk} for i in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, items, format='json')
+            self.assertEqual(len(response.data['results']), count)
+            return len(context)
+
+        self.assertEqual(post(3, 0), post(60, 100))
+
+    def test_bulk_update_only_changes_status_for_regular_users(self):
+        tasks = Task.objects.bulk_create([Task(title=f'Task {i}', created_by=self.user) for i in range(2)])
+        hidden = Task.objects.create(title='Hidden', created_by=self.assignee)
+        response = self.client.patch(self.url, [
+            {'id': tasks[0].id, 'status': TaskStatus.COMPLETED.value, 'title': 'Renamed'},
+            {'id': tasks[1].id, 'status': TaskStatus.ON_HOLD.value},
+            {'id': hidden.id, 'status': TaskStatus.COMPLETED.value},
+            {'status': TaskStatus.COMPLETED.value},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([error['index'] for error in response.data['errors']], [2, 3])
+        tasks[0].refresh_from_db()
+        self.assertEqual((tasks[0].title, tasks[0].status), ('Task 0', TaskStatus.COMPLETED.value))
+        self.assertEqual(Task.objects.get(pk=hidden.pk).status, TaskStatus.NOT_STARTED.value)
+
+    def test_bulk_update_checks_titles_for_superusers(self):
+        self.user.is_superuser = True
+        self.user.save()
+        tasks = Task.objects.bulk_create([Task(title=f'Task {i}', created_by=self.user) for i in range(2)])
+        response = self.client.patch(self.url, [
+            {'id': tasks[0].id, 'title': 'task 1'},
+            {'id': tasks[1].id, 'assigned_to': self.assignee.pk},
+        ], format='json')
+
+        self.assertEqual([error['index'] for error in response.data['errors']], [0])
+        tasks[1].refresh_from_db()
+        self.assertEqual((tasks[1].title, tasks[1].assigned_to), ('Task 1', self.assignee))
+
+    def test_bulk_update_failed_rename_keeps_its_title_taken(self):
+        self.user.is_superuser = True
+        self.user.save()
+        tasks = Task.objects.bulk_create([Task(title=f'Task {i}', created_by=self.user) for i in range(2)])
+        response = self.client.patch(self.url, [
+            {'id': tasks[0].id, 'title': 'Task 1'},
+            {'id': tasks[1].id, 'title': 'Renamed', 'assigned_to': 999999},
+        ], format='json')
+
+        self.assertEqual([error['index'] for error in response.data['errors']], [0, 1])
+        self.assertEqual(sorted(Task.objects.values_list('title', flat=True)), ['Task 0', 'Task 1'])
+
+    def test_bulk_delete(self):
+        mine = Task.objects.create(title='Mine', created_by=self.user)
+        hidden = Task.objects.create(title='Hidden', created_by=self.assignee)
+        response = self.client.delete(self.url, {'ids': [mine.id, hidden.id]}, format='json')
+
+        self.assertEqual(response.data['deleted'], [mine.id])
+        self.assertEqual([error['id'] for error in response.data['errors']], [hidden.id])
+        self.assertTrue(Task.objects.filter(pk=hidden.pk).exists())
+        self.assertFalse(Task.objects.filter(pk=mine.pk).exists())
+        self.assertTrue(TaskTombstone.objects.filter(task_id=mine.pk, reason=TaskTombstone.DELETED).exists())
+
+    def test_bulk_delete_query_count_is_constant(self):
+        def delete(count, offset):
+            tasks = [Task.objects.create(title=f'Task {offset + i}', created_by=self.user, assigned_to=self.assignee)
+                     for i in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.delete(self.url, {'ids': [task.id for task in tasks]}, format='json')
+            self.assertEqual(len(response.data['deleted']), count)
+            return len(context)
+
+        delete(1, 500)  # warms the user's cached authorization profile
+        self.assertEqual(delete(3, 0), delete(60, 100))
+        self.assertEqual(counters.find_drift(), {})
+
+    def test_bulk_delete_refuses_to_skip_cascades(self):
+        task = Task.objects.create(title='Mine', created_by=self.user)
+        relation = mock.Mock()
+        relation.name = 'comments'
+        with mock.patch.object(Task._meta, 'related_objects', (relation,)), \
+                self.assertRaisesMessage(ImproperlyConfigured, 'comments'):
+            TaskService.bulk_delete_tasks(self.user, [task.id])
+        self.assertTrue(Task.objects.filter(pk=task.pk).exists())
+
+    @override_settings(TASK_BULK_MAX_ITEMS=2)
+    def test_batch_size_is_capped(self):
+        response = self.client.post(self.url, [{'title': f'T{i}'} for i in range(3)], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskDeltaSyncTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        self.unchanged = Task.objects.create(title='Unchanged', created_by=self.user)
+        Task.objects.filter(pk=self.unchanged.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def changes(self, since):
+        return self.client.get(reverse('tasks-changes'), {'since': since})
+
+    def test_list_returns_a_cursor(self):
+        response = self.client.get(reverse('tasks-list'))
+        self.assertTrue(response['X-Sync-Cursor'].isdigit())
+
+    def test_returns_only_changed_and_deleted_tasks(self):
+        since = self.client.get(reverse('tasks-list'))['X-Sync-Cursor']
+        edited = Task.objects.create(title='Edited', created_by=self.user)
+        doomed = Task.objects.create(title='Doomed', created_by=self.user)
+        doomed_id = doomed.id
+        doomed.delete()
+        Task.objects.create(title='Not mine', created_by=self.other).delete()
+
+        response = self.changes(since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['id'] for task in response.data['changed']], [edited.id])
+        self.assertEqual(response.data['deleted'], [doomed_id])
+        self.assertTrue(response.data['cursor'].isdigit())
+
+    def test_reassigned_task_is_removed_from_previous_assignee(self):
+        task = Task.objects.create(title='Shared', created_by=self.other, assigned_to=self.user)
+        since = self.client.get(reverse('tasks-list'))['X-Sync-Cursor']
+        task.assigned_to = None
+        task.save()
+
+        response = self.changes(since)
+        self.assertEqual(response.data['changed'], [])
+        self.assertEqual(response.data['deleted'], [task.id])
+
+    def test_bulk_updates_are_tracked(self):
+        since = self.client.get(reverse('tasks-list'))['X-Sync-Cursor']
+        TaskService.update_statuses({self.unchanged.id: TaskStatus.PENDING.value}, user=self.user)
+        response = self.changes(since)
+        self.assertEqual([task['id'] for task in response.data['changed']], [self.unchanged.id])
+
+    def test_invalid_and_expired_cursors(self):
+        self.assertEqual(self.changes('yesterday').status_code, 400)
+        self.assertEqual(self.changes('0').status_code, 410)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.client.force_authenticate(self.user)
+        self.task = Task.objects.create(title='Task', created_by=self.user)
+
+    def assertNotModifiedWithoutQueries(self, url):
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        return etag
+
+    def test_list(self):
+        url = reverse('tasks-list')
+        etag = self.assertNotModifiedWithoutQueries(url)
+        self.task.status = TaskStatus.PENDING.value
+        self.task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_depends_on_query(self):
+        url = reverse('tasks-list')
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, {'status': 'Pending'})['ETag'])
+
+    def test_list_etag_follows_the_date_and_usernames(self):
+        url = reverse('tasks-list')
+        etag = self.client.get(url, {'overdue': 'true'})['ETag']
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with mock.patch('django.utils.timezone.localdate', return_value=tomorrow):
+            self.assertEqual(self.client.get(url, {'overdue': 'true'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(url)['ETag']
+        self.user.username = 'alicia'
+        self.user.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail(self):
+        url = reverse('tasks-detail', args=[self.task.pk])
+        etag = self.assertNotModifiedWithoutQueries(url)
+        Task.objects.create(title='Other', created_by=self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_validators_only_for_visible_tasks(self):
+        hidden = Task.objects.create(title='Hidden', created_by=User.objects.create_user(username='bob'))
+        for pk in (999991, hidden.pk):
+            url = reverse('tasks-detail', args=[pk])
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+            self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(TAG_KEY.format(tag=TASK_TAG.format(task_id=999991))))
+
+        # A task whose version expired gets a new one once it is read
+        cache.delete(TAG_KEY.format(tag=TASK_TAG.format(task_id=self.task.pk)))
+        url = reverse('tasks-detail', args=[self.task.pk])
+        self.assertNotIn('ETag', self.client.get(url))
+        self.assertNotModifiedWithoutQueries(url)
+
+    def test_dashboard(self):
+        url = reverse('dashboard')
+        etag = self.assertNotModifiedWithoutQueries(url)
+        self.task.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_writes_within_one_second_change_the_etag(self):
+        # Last-Modified would name the same second for both versions, so it is not sent
+        response = self.client.get(reverse('tasks-list'))
+        self.assertNotIn('Last-Modified', response)
+        self.task.save()
+        response = self.client.get(reverse('tasks-list'), HTTP_IF_NONE_MATCH=response['ETag'],
+                                   HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+
+class TaskListFastPathTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.assignee = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        Task.objects.create(title='Assigned', created_by=self.user, assigned_to=self.assignee,
+                            due_date=date.today(), priority=PriorityEnum.HIGH.value)
+        Task.objects.create(title='Unassigned', created_by=self.user, status=TaskStatus.ON_HOLD.value)
+
+    def test_matches_task_serializer(self):
+        response = self.client.get(reverse('tasks-list'), {'paginate': 'false'})
+        expected = TaskSerializer(TaskService.get_tasks_for_user(self.user), many=True).data
+        self.assertEqual(json.loads(response.content), json.loads(json.dumps(expected)))
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(reverse('tasks-list'), {'fields': 'id,title,status_label'})
+        self.assertEqual(
+            [set(task) for task in response.data['results']],
+            [{'id', 'title', 'status_label'}] * 2,
+        )
+        self.assertEqual(response.data['results'][1]['status_label'], 'On Hold')
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('tasks-list'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_msgpack_rendering(self):
+        response = self.client.get(reverse('tasks-list'), {'format': 'msgpack', 'fields': 'title'})
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            [task['title'] for task in msgpack.unpackb(response.content)['results']],
+            ['Assigned', 'Unassigned'],
+        )
+
+
+class TaskExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        Task.objects.create(title='Urgent, "quoted"', created_by=self.user, priority=PriorityEnum.HIGH.value,
+                            due_date=date.today())
+        Task.objects.create(title='Later', created_by=self.user, due_date=date.today() + timedelta(days=7))
+        Task.objects.create(title='Not mine', created_by=self.other)
+
+    def export(self, **params):
+        response = self.client.get(reverse('tasks-export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        response, body = self.export(fields='id,title,priority_label')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['title'] for row in rows], ['Urgent, "quoted"', 'Later'])
+        self.assertEqual(list(rows[0]), ['id', 'title', 'priority_label'])
+        self.assertEqual(rows[0]['priority_label'], 'High')
+
+    def test_ndjson_export_honors_filters(self):
+        response, body = self.export(format='ndjson', priority=PriorityEnum.HIGH.value)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([record['title'] for record in records], ['Urgent, "quoted"'])
+
+    def test_rows_are_read_in_chunks(self):
+        with override_settings(TASK_EXPORT_CHUNK_SIZE=1):
+            _, body = self.export(format='ndjson', fields='id')
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get(reverse('tasks-export'), {'priority': 'Urgent'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_asynchronous_iteration(self):
+        async def collect():
+            return [chunk async for chunk in _iterate_in_thread(iter(['a', 'b']))]
+
+        self.assertEqual(async_to_sync(collect)(), ['a', 'b'])
+
+
+class TaskImportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.assignee = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        Task.objects.create(title='Existing', created_by=self.user)
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            reverse('tasks-import'), {'file': SimpleUploadedFile(name, content.encode()), **data}, format='multipart'
+        )
+
+    def test_csv_import_reports_errors_by_line(self):
+        response = self.upload('legacy.csv', (
+            'title,priority,status,due_date,assigned_to\n'
+            'Migrate,high,in progress,2024-05-01,bob\n'
+            'existing,Low,,,\n'
+            'Migrate,Low,,,\n'
+            'Bad priority,Urgent,,,\n'
+            'Bad date,,,01/05/2024,\n'
+            'Nobody,,,,carol\n'
+            ',,,,\n'
+        ))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(response.data['rejected'], 6)
+        self.assertEqual(
+            {error['line']: set(error['errors']) for error in response.data['errors']},
+            {3: {'title'}, 4: {'title'}, 5: {'priority'}, 6: {'due_date'}, 7: {'assigned_to'}, 8: {'title'}},
+        )
+        task = Task.objects.get(title='Migrate')
+        self.assertEqual((task.priority, task.status), (PriorityEnum.HIGH.value, TaskStatus.IN_PROGRESS.value))
+        self.assertEqual((task.due_date, task.assigned_to, task.created_by), (date(2024, 5, 1), self.assignee, self.user))
+
+    def test_ndjson_import(self):
+        response = self.upload('tasks.jsonl', '{"title": "One"}\n\nnot json\n{"title": "Two", "assigned_to_username": "bob"}\n')
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['errors'], [{'line': 3, 'errors': {'non_field_errors': ["Expected a JSON object."]}}])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def queries_for(count):
+            rows = ''.join(f'Task {count} {i},bob\n' for i in range(count))
+            with CaptureQueriesContext(connection) as context:
+                self.upload(f'tasks-{count}.csv', 'title,assigned_to\n' + rows)
+            return len(context)
+
+        self.assertEqual(queries_for(2), queries_for(20))
+
+    def test_assignees_are_looked_up_per_batch_and_must_be_active(self):
+        User.objects.create_user(username='carol', password='pass', is_active=False)
+        User.objects.bulk_create([User(username=f'user{i}') for i in range(50)])
+        records = [(1, {'title': 'To bob', 'assigned_to': 'bob'}), (2, {'title': 'To carol', 'assigned_to': 'carol'})]
+        with CaptureQueriesContext(connection) as context:
+            created, rejected, errors = TaskService.import_tasks(self.user, records)
+
+        self.assertEqual((created, rejected), (1, 1))
+        self.assertEqual(errors, {2: {'assigned_to': ['User "carol" is inactive.']}})
+        user_queries = [query['sql'] for query in context if 'auth_user' in query['sql'] and 'IN' in query['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertEqual(Task.objects.get(title='To bob').assigned_to, self.assignee)
+
+    def test_batches_check_titles_against_earlier_batches(self):
+        records = [(1, {'title': 'Same'}), (2, {'title': 'Other'}), (3, {'title': 'same'})]
+        created, rejected, errors = TaskService.import_tasks(self.user, records, batch_size=2)
+        self.assertEqual((created, rejected, list(errors)), (2, 1, [3]))
+
+    def test_unknown_format_is_rejected(self):
+        response = self.upload('tasks.xlsx', 'title\n')
+        self.assertEqual(response.status_code, 400)
+        response = self.upload('tasks.txt', 'title\nFrom txt\n', file_format='csv')
+        self.assertEqual(response.data['created'], 1)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('title,priority\nFrom command,Medium\n')
+        self.addCleanup(os.remove, handle.name)
+        out = io.StringIO()
+        call_command('import_tasks', handle.name, user='alice', stdout=out)
+        self.assertIn('Created 1 tasks', out.getvalue())
+        self.assertTrue(Task.objects.filter(title='From command', priority=PriorityEnum.MEDIUM.value).exists())
+
+
+class TaskSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        Task.objects.create(title='Quarterly report', description='Numbers for finance', created_by=self.user)
+        Task.objects.create(title='Call finance', description='About the quarterly report', created_by=self.user)
+        Task.objects.create(title='Water plants', created_by=self.user)
+        Task.objects.create(title='Quarterly report draft', created_by=self.other)
+
+    def search(self, q, **params):
+        response = self.client.get(reverse('tasks-list'), {'q': q, 'fields': 'title', **params})
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in response.data['results']]
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('quarterly report'), ['Quarterly report', 'Call finance'])
+
+    def test_search_pages_in_rank_order(self):
+        titles = []
+        url = reverse('tasks-list') + '?q=report&fields=title&page_size=1'
+        while url:
+            response = self.client.get(url)
+            titles.extend(task['title'] for task in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(titles, ['Quarterly report', 'Call finance'])
+
+    def test_rank_is_cast_to_double_precision(self):
+        queryset = search_tasks(Task.objects.all(), 'report')
+        rank = queryset.query.annotations[RANK_FIELD]
+        self.assertIsInstance(rank, Cast)
+        self.assertIsInstance(rank.output_field, FloatField)
+        self.assertEqual(queryset.query.order_by[0], '-' + RANK_FIELD)
+
+    @skipUnless(connection.vendor == 'postgresql', 'ts_rank only exists on PostgreSQL')
+    def test_search_pages_through_fractional_ranks(self):
+        Task.objects.bulk_create([
+            Task(title=f'Report {i}', description='report ' * i, created_by=self.user) for i in range(1, 12)
+        ])
+        expected = [task.title for task in search_tasks(Task.objects.filter(created_by=self.user), 'report')
+                    .order_by('-' + RANK_FIELD, 'created_on', 'id')]
+        titles = []
+        url = reverse('tasks-list') + '?q=report&fields=title&page_size=2'
+        while url:
+            response = self.client.get(url)
+            titles.extend(task['title'] for task in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(titles, expected)
+
+    def test_search_combines_with_filters_and_export(self):
+        Task.objects.filter(title='Call finance').update(priority=PriorityEnum.HIGH.value)
+        self.assertEqual(self.search('finance', priority=PriorityEnum.HIGH.value), ['Call finance'])
+        response = self.client.get(reverse('tasks-export'), {'q': 'plants', 'format': 'ndjson', 'fields': 'title'})
+        self.assertEqual(b''.join(response.streaming_content), b'{"title":"Water plants"}\n')
+
+    def test_search_vector_is_not_serialized(self):
+        task = Task.objects.filter(created_by=self.user).first()
+        self.assertNotIn('search_vector', self.client.get(reverse('tasks-detail', args=[task.id])).data)
+
+    @skipUnless(connection.vendor == 'postgresql', 'The search_vector trigger only exists on PostgreSQL')
+    def test_trigger_keeps_vector_current(self):
+        Task.objects.bulk_create([Task(title='Running errands', created_by=self.user)])
+        self.assertEqual(self.search('run'), ['Running errands'])
+        Task.objects.filter(title='Running errands').update(title='Gardening')
+        self.assertEqual(self.search('run'), [])
+        self.assertEqual(self.search('garden'), ['Gardening'])
+
+
+class TaskFilterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.assignee = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+        today = date.today()
+        Task.objects.create(title='Late', created_by=self.user, due_date=today - timedelta(days=1),
+                            priority=PriorityEnum.HIGH.value, status=TaskStatus.PENDING.value)
+        Task.objects.create(title='Late but done', created_by=self.user, due_date=today - timedelta(days=1),
+                            status=TaskStatus.COMPLETED.value)
+        Task.objects.create(title='Next week', created_by=self.user, due_date=today + timedelta(days=7),
+                            priority=PriorityEnum.MEDIUM.value, assigned_to=self.assignee)
+        Task.objects.create(title='Someday', created_by=self.user)
+        Task.objects.filter(title='Someday').update(created_on=timezone.now() - timedelta(days=30))
+
+    def titles(self, **params):
+        response = self.client.get(reverse('tasks-list'), {'paginate': 'false', 'fields': 'title', **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return {task['title'] for task in response.data}
+
+    def test_due_date_range(self):
+        today = date.today()
+        self.assertEqual(self.titles(due_date__gte=str(today), due_date__lte=str(today + timedelta(days=7))),
+                         {'Next week'})
+        self.assertEqual(self.titles(due_date=str(today + timedelta(days=7))), {'Next week'})
+
+    def test_created_on_range(self):
+        cutoff = (timezone.now() - timedelta(days=1)).isoformat()
+        self.assertEqual(self.titles(created_on__lt=cutoff), {'Someday'})
+        self.assertEqual(self.titles(created_on__gte=cutoff), {'Late', 'Late but done', 'Next week'})
+
+    def test_multi_value_filters(self):
+        self.assertEqual(self.titles(priority__in='High,Medium'), {'Late', 'Next week'})
+        self.assertEqual(self.titles(status__in='Pending,Completed'), {'Late', 'Late but done'})
+        response = self.client.get(reverse('tasks-list'), {'status__in': 'Pending,Done'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_overdue(self):
+        self.assertEqual(self.titles(overdue='true'), {'Late'})
+        self.assertEqual(self.titles(overdue='false'), {'Late but done', 'Next week', 'Someday'})
+
+    def test_unassigned(self):
+        self.assertEqual(self.titles(unassigned='false'), {'Next week'})
+        self.assertEqual(len(self.titles(unassigned='true')), 3)
+
+    def test_assignee_filters(self):
+        self.assertEqual(self.titles(assigned_to=self.assignee.id), {'Next week'})
+        self.assertEqual(self.titles(assigned_to__in=f'{self.assignee.id},{self.user.id}'), {'Next week'})
+
+    def test_unknown_assignees_are_rejected_with_one_query(self):
+        User.objects.bulk_create([User(username=f'user{i}') for i in range(50)])
+        form = TaskFilter({'assigned_to': '999', 'assigned_to__in': f'{self.assignee.id},998'}).form
+        with self.assertNumQueries(1):
+            self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'assigned_to', 'assigned_to__in'})
+        response = self.client.get(reverse('tasks-list'), {'assigned_to': 999})
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskListCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        self.task = Task.objects.create(title='Write report', created_by=self.user, assigned_to=self.other)
+        self.client.force_authenticate(self.user)
+
+    def get(self, **params):
+        return self.client.get(reverse('tasks-list'), params)
+
+    def test_pages_are_cached_per_user_and_query(self):
+        self.assertEqual(self.get(priority='Low', status='Pending')['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get(status='Pending', priority='Low')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertIn('X-Sync-Cursor', response)
+        self.assertEqual(self.get(priority='High')['X-Cache'], 'MISS')
+
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.get(priority='Low', status='Pending')['X-Cache'], 'MISS')
+
+    def test_versions_are_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskService.update_task(self.task, self.user, status=TaskStatus.PENDING.value)
+            # A request that read the old row before the commit caches it under this version
+            self.get()
+            during = collection_version(self.user, admin=False)
+        self.assertGreater(collection_version(self.user, admin=False), during)
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+
+    @override_settings(VIEW_CACHE_MAX_ITEMS=1)
+    def test_large_responses_are_not_cached(self):
+        Task.objects.create(title='Another', created_by=self.user)
+        self.get(paginate='false')
+        self.assertEqual(self.get(paginate='false')['X-Cache'], 'MISS')
+        self.get(page_size=1)
+        self.assertEqual(self.get(page_size=1)['X-Cache'], 'HIT')
+
+    def test_task_and_user_changes_invalidate(self):
+        self.get()
+        self.client.patch(reverse('tasks-detail', args=[self.task.pk]), {'status': 'Completed'})
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['status'], 'Completed')
+
+        self.other.username = 'robert'
+        self.other.save()
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['assigned_to_username'], 'robert')
+
+    def test_hits_and_misses_are_counted(self):
+        self.get()
+        self.get()
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(metrics()['tasks:list'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        self.assertEqual(metrics()['tasks:dashboard']['misses'], 1)
+
+        out = io.StringIO()
+        call_command('cache_stats', '--reset', stdout=out)
+        self.assertIn('tasks:list: 1 hits, 1 misses, hit rate 50.0%', out.getvalue())
+        self.assertEqual(metrics()['tasks:list']['hits'], 0)
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        replicas = override_settings(DATABASE_REPLICAS=['replica'])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        self.lag = mock.patch('core.db_router.replica_lag', return_value=0.0).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def route(self, method='get', user=None, view=None, write=False, check=None):
+        """Runs a request through the middleware and returns the alias its reads use."""
+        request = getattr(RequestFactory(), method)('/')
+        request.user = user or self.user
+        seen = {}
+
+        def get_response(request):
+            if view is not None:
+                middleware.process_view(request, view, (), {})
+            if write:
+                router.db_for_write(Task)
+            seen['alias'] = router.db_for_read(Task)
+            if check is not None:
+                check()
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        middleware(request)
+        return seen['alias']
+
+    def test_safe_requests_read_from_a_replica(self):
+        self.assertEqual(self.route('get'), 'replica')
+        self.assertEqual(self.route('post'), 'default')
+        # Outside a request, e.g. in management commands
+        self.assertEqual(router.db_for_read(Task), 'default')
+
+    def test_session_user_is_loaded_from_the_primary(self):
+        admin = User.objects.create_superuser(username='root', password='pass')
+        self.client.force_login(admin)
+        aliases = []
+        read_alias = RequestRouting.read_alias
+
+        def record(routing):
+            aliases.append(read_alias(routing))
+            # The test database stands in for the replica
+            return DEFAULT_DB_ALIAS
+
+        with mock.patch.object(RequestRouting, 'read_alias', record):
+            self.assertEqual(self.client.get('/admin/').status_code, 200)
+        # The session and its user come from the primary, the rest from the replica
+        self.assertEqual(aliases[0], DEFAULT_DB_ALIAS)
+        self.assertIn('replica', aliases)
+
+    def test_writers_read_their_writes(self):
+        self.route('post', write=True)
+        self.assertEqual(self.route('get'), 'default')
+        self.assertEqual(self.route('get', user=self.other), 'replica')
+        self.assertEqual(self.route('get', user=self.other, write=True), 'default')
+
+    def test_websocket_writes_pin_the_user(self):
+        task = Task.objects.create(title='Task', created_by=self.user)
+        # As TaskConsumer does, outside any request
+        TaskService.update_statuses({task.pk: TaskStatus.PENDING.value}, user=self.user)
+        self.assertEqual(self.route('get'), 'default')
+        self.assertEqual(self.route('get', user=self.other), 'replica')
+
+    def test_per_view_override(self):
+        primary_view = read_database(PRIMARY)(lambda request: None)
+        self.assertEqual(self.route('get', view=primary_view), 'default')
+        # Exports read from a replica even right after the user wrote
+        self.route('post', write=True)
+        self.assertEqual(self.route('get', view=TaskViewSet.as_view({'get': 'export'})), 'replica')
+
+    def test_lagging_replicas_are_skipped(self):
+        self.lag.return_value = 30.0
+        self.assertEqual(self.route('get'), 'default')
+
+    def test_replica_reads_are_not_cached_under_recent_versions(self):
+        def check():
+            self.assertTrue(may_be_stale(time.time_ns()))
+            self.assertFalse(may_be_stale(time.time_ns() - 60 * 1_000_000_000))
+        self.route('get', check=check)
+        self.assertFalse(may_be_stale(time.time_ns()))
+
+
+class TaskCounterTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.other = User.objects.create_user(username='bob', password='pass')
+        self.client.force_authenticate(self.user)
+
+    def count(self, user_id, key):
+        counter = TaskCounter.objects.filter(user_id=user_id, key=key).first()
+        return counter.count if counter else 0
+
+    def test_counters_follow_task_writes(self):
+        task = Task.objects.create(title='Report', created_by=self.user, assigned_to=self.other, due_date=date.today())
+        self.assertEqual(self.count(self.other.pk, counters.ASSIGNED), 1)
+        self.assertEqual(self.count(TaskCounter.ALL_TASKS, counters.TOTAL), 1)
+
+        task.status = TaskStatus.COMPLETED.value
+        task.save()
+        self.assertEqual(self.count(self.user.pk, 'status:Completed'), 1)
+        self.assertEqual(self.count(self.user.pk, 'priority:Low'), 0)
+
+        task.assigned_to = None
+        task.priority = PriorityEnum.HIGH.value
+        # Only the assignee is written; the priority change is not saved
+        task.save(update_fields=['assigned_to'])
+        self.assertEqual(self.count(self.other.pk, counters.TOTAL), 0)
+
+        deferred = Task.objects.only('title').get(pk=task.pk)
+        deferred.status = TaskStatus.PENDING.value
+        deferred.save()
+        self.assertEqual(self.count(self.user.pk, 'status:Pending'), 1)
+        self.assertEqual(counters.find_drift(), {})
+
+        deferred.delete()
+        self.assertEqual(self.count(self.user.pk, counters.TOTAL), 0)
+        self.assertEqual(counters.find_drift(), {})
+
+    def test_concurrent_writes_of_one_task(self):
+        task = Task.objects.create(title='Report', created_by=self.user, assigned_to=self.other)
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        TaskService.update_task(first, self.user, status=TaskStatus.IN_PROGRESS.value)
+        TaskService.update_task(second, self.user, status=TaskStatus.COMPLETED.value)
+        self.assertEqual(counters.find_drift(), {})
+
+        # A stale copy reassigned by a superuser, then a status change over the websocket
+        stale = Task.objects.get(pk=task.pk)
+        first.assigned_to = None
+        first.save(update_fields=['assigned_to'])
+        TaskService.update_statuses({stale.pk: TaskStatus.PENDING.value}, self.user)
+        Task.objects.get(pk=task.pk).delete()
+        self.assertEqual(counters.find_drift(), {})
+
+    def test_bulk_endpoints_update_counters(self):
+        url = reverse('tasks-bulk-create')
+        response = self.client.post(url, [
+            {'title': 'One', 'assigned_to': self.other.pk},
+            {'title': 'Two', 'due_date': str(date.today())},
+        ], format='json')
+        ids = [task['id'] for task in response.data['results']]
+        self.client.patch(url, [{'id': ids[0], 'status': TaskStatus.ON_HOLD.value}], format='json')
+        self.assertEqual(counters.find_drift(), {})
+        self.assertEqual(self.client.get(reverse('dashboard')).data['tasks_due_today'], 1)
+
+        self.client.delete(url, {'ids': ids}, format='json')
+        self.assertEqual(counters.find_drift(), {})
+        self.assertEqual(self.client.get(reverse('dashboard')).data['total_tasks'], 0)
+
+    def test_rebuild_corrects_drift(self):
+        Task.objects.create(title='Report', created_by=self.user)
+        self.assertEqual(self.client.get(reverse('dashboard')).data['total_tasks'], 1)
+        TaskCounter.objects.filter(user_id=self.user.pk, key=counters.TOTAL).update(count=5)
+        # Written without signals
+        Task.objects.bulk_create([Task(title='Raw', created_by=self.user)])
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_task_counters', '--check', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('rebuild_task_counters', stdout=out)
+        self.assertIn(f'user {self.user.pk} total: stored 5, expected 2', out.getvalue())
+        call_command('rebuild_task_counters', '--check', stdout=io.StringIO())
+        self.assertEqual(self.client.get(reverse('dashboard')).data['total_tasks'], 2)
+
+    def test_rebuild_deletes_empty_counters(self):
+        yesterday = date.today() - timedelta(days=1)
+        Task.objects.create(title='Kept', created_by=self.user)
+        Task.objects.create(title='Done', created_by=self.user, due_date=yesterday).delete()
+        due = counters.DUE_KEY.format(day=yesterday)
+        self.assertEqual(set(TaskCounter.objects.filter(key=due).values_list('count', flat=True)), {0})
+
+        self.assertEqual(counters.rebuild(), {})
+        self.assertFalse(TaskCounter.objects.filter(count=0).exists())
+        self.assertEqual(counters.find_drift(), {})
+        self.assertEqual(self.client.get(reverse('dashboard')).data['total_tasks'], 1)
@@ -1,23 +1,157 @@
-from rest_framework import viewsets
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 
+from core.caching import cache_response
+from core.db_router import REPLICA, read_database
+
+from .cache import start_object_version, task_list_tags, task_list_vary
+from .conditional import conditional_dashboard, conditional_task_detail, conditional_task_list
+from .filters import TaskFilter
+from .imports import IMPORT_FORMATS, decode_upload, detect_format, read_records
+from .pagination import TaskCursorPagination
 from .permissions import IsAdminOrTaskOwner
-from .serializers import TaskSerializer
+from .renderers import CSVRenderer, NDJSONRenderer, task_renderer_classes
+from .search import TaskSearchFilter
+from .serializers import TaskBulkItemSerializer, TaskListSerializer, TaskSerializer
 from .services import TaskService
 
 
+def encode_sync_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_sync_cursor(cursor):
+    try:
+        return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ValidationError({"since": ["Invalid sync cursor."]})
+
+
+def next_sync_cursor():
+    # Step back a little so rows from transactions still in flight are not skipped;
+    # clients may therefore see a task twice and should upsert by id.
+    return encode_sync_cursor(timezone.now() - timedelta(seconds=settings.TASK_SYNC_OVERLAP_SECONDS))
+
+
+async def _iterate_in_thread(chunks):
+    # Under ASGI Django would collect a synchronous iterator into a list before sending it.
+    # Pull one chunk at a time instead; thread-sensitive calls share the request's thread,
+    # which the server-side cursor belongs to.
+    pull = sync_to_async(next)
+    while (chunk := await pull(chunks, None)) is not None:
+        yield chunk
+
+
 class TaskViewSet(viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated, IsAdminOrTaskOwner]
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['priority', 'due_date', 'assigned_to', 'status']
+    pagination_class = TaskCursorPagination
+    renderer_classes = task_renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES)
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter]
+    filterset_class = TaskFilter
 
     def get_queryset(self):
-        return TaskService.get_tasks_for_user(self.request.user)
+        queryset = TaskService.get_tasks_for_user(self.request.user)
+        return TaskService.shape_for_serialization(queryset)
+
+    @conditional_task_list
+    def list(self, request, *args, **kwargs):
+        """
+        Lists tasks through the ``.values()`` fast path. ``?fields=id,title,...``
+        returns a sparse fieldset and ``?q=`` searches titles and descriptions.
+        """
+        # Taken first: a page served from the cache is as current as one read now,
+        # since nothing the user can see has changed since it was stored.
+        cursor = next_sync_cursor()
+        response = self.list_page(request)
+        response['X-Sync-Cursor'] = cursor
+        return response
+
+    @cache_response('tasks:list', task_list_tags, vary=task_list_vary)
+    def list_page(self, request):
+        fields = request.query_params.get('fields')
+        reader = TaskListSerializer(fields.split(',') if fields else None)
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = self.paginator.get_ordering(request, queryset, self)
+        rows = queryset.values(*reader.columns(extra=[field.lstrip('-') for field in ordering]))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.many(page))
+        return Response(reader.many(rows))
+
+    @conditional_task_detail
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # The task exists and the user may see it: later reads can be validated
+        start_object_version(kwargs['pk'])
+        return response
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Delta sync: returns the tasks changed and the ids of tasks removed from the
+        user's view since ``?since=<cursor>``, plus the cursor for the next call.
+        Clients should apply ``deleted`` before ``changed``. 410 means the cursor is too
+        old or too much has changed, and the client should reload the full list.
+        """
+        since = decode_sync_cursor(request.query_params.get('since'))
+        cursor = next_sync_cursor()
+        if since < timezone.now() - timedelta(days=settings.TASK_TOMBSTONE_RETENTION_DAYS):
+            return Response({"detail": "Sync cursor expired."}, status=status.HTTP_410_GONE)
+
+        changed, deleted = TaskService.get_changes(request.user, since)
+        limit = settings.TASK_SYNC_MAX_CHANGES
+        changed = list(TaskService.shape_for_serialization(changed)[:limit + 1])
+        if len(changed) > limit:
+            return Response({"detail": "Too many changes, reload the task list."}, status=status.HTTP_410_GONE)
+
+        return Response({
+            'changed': TaskSerializer(changed, many=True).data,
+            'deleted': sorted(deleted),
+            'cursor': cursor,
+        })
+
+    @read_database(REPLICA)
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        """
+        Streams every task visible to the user as CSV (default) or NDJSON
+        (``?format=ndjson`` or ``Accept: application/x-ndjson``). Takes the TaskFilter
+        parameters and ``?fields=``. Rows are read through a server-side cursor, so
+        memory use does not grow with the size of the export.
+        """
+        fields = request.query_params.get('fields')
+        reader = TaskListSerializer(fields.split(',') if fields else None)
+        queryset = self.filter_queryset(TaskService.get_tasks_for_user(request.user))
+        # Rows are read after the view returns, outside the request's routing, so pick the replica now
+        queryset = queryset.using(router.db_for_read(queryset.model))
+        chunk_size = settings.TASK_EXPORT_CHUNK_SIZE
+        rows = queryset.values(*reader.columns()).iterator(chunk_size=chunk_size)
+
+        renderer = request.accepted_renderer
+        chunks = renderer.stream(reader.iterate(rows), reader.names, chunk_size=chunk_size)
+        if isinstance(request._request, ASGIRequest):
+            chunks = _iterate_in_thread(chunks)
+        content_type = f'{renderer.media_type}; charset={renderer.charset}'
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="tasks.{renderer.format}"'
+        return response
 
     def perform_create(self, serializer):
         try:
@@ -36,11 +170,95 @@ class TaskViewSet(viewsets.ModelViewSet):
         TaskService.delete_task(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Creates a list of tasks. Valid items are created even if others are rejected."""
+        items, errors = self._validate_bulk_items(request.data, partial=False)
+        tasks, item_errors = TaskService.bulk_create_tasks(request.user, items)
+        errors.update(item_errors)
+        return self._bulk_response(tasks, errors, status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Partially updates a list of tasks, each identified by its ``id``."""
+        items, errors = self._validate_bulk_items(request.data, partial=True)
+        for index, data in list(items.items()):
+            if 'id' not in data:
+                errors[index] = {'id': ["This field is required."]}
+                del items[index]
+        tasks, item_errors = TaskService.bulk_update_tasks(request.user, items)
+        errors.update(item_errors)
+        return self._bulk_response(tasks, errors, status.HTTP_200_OK)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request):
+        """Deletes the tasks listed in ``{"ids": [...]}``."""
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(task_id, int) for task_id in ids):
+            raise ValidationError({"ids": ["Expected a list of task ids."]})
+        self._check_bulk_size(ids)
+        deleted, missing = TaskService.bulk_delete_tasks(request.user, ids)
+        return Response({
+            'deleted': sorted(deleted),
+            'errors': [{'id': task_id, 'errors': {'id': ["Task not found."]}} for task_id in missing],
+        })
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import', parser_classes=[MultiPartParser])
+    def import_tasks(self, request):
+        """
+        Creates tasks from an uploaded CSV or NDJSON ``file``. The format comes from
+        the file name, or from the ``file_format`` field. Valid rows are created even
+        if others are rejected; errors are reported by line number.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({"file": ["No file was submitted."]})
+        file_format = request.data.get('file_format') or detect_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            raise ValidationError({"file_format": [f"Expected one of: {', '.join(IMPORT_FORMATS)}."]})
+
+        records = read_records(decode_upload(upload), file_format)
+        created, rejected, errors = TaskService.import_tasks(request.user, records)
+        return Response(
+            {
+                'created': created,
+                'rejected': rejected,
+                'errors': [{'line': line, 'errors': errors[line]} for line in sorted(errors)],
+            },
+            status=status.HTTP_201_CREATED if created or not rejected else status.HTTP_400_BAD_REQUEST,
+        )
+
+    def _check_bulk_size(self, items):
+        if len(items) > settings.TASK_BULK_MAX_ITEMS:
+            raise ValidationError({"detail": f"At most {settings.TASK_BULK_MAX_ITEMS} items per request."})
+
+    def _validate_bulk_items(self, data, partial):
+        if not isinstance(data, list):
+            raise ValidationError({"detail": "Expected a list of tasks."})
+        self._check_bulk_size(data)
+        items, errors = {}, {}
+        for index, item in enumerate(data):
+            serializer = TaskBulkItemSerializer(data=item, partial=partial)
+            if serializer.is_valid():
+                items[index] = serializer.validated_data
+            else:
+                errors[index] = serializer.errors
+        return items, errors
+
+    def _bulk_response(self, tasks, errors, success_status):
+        return Response(
+            {
+                'results': TaskSerializer(tasks, many=True).data,
+                'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors)],
+            },
+            status=success_status if tasks or not errors else status.HTTP_400_BAD_REQUEST,
+        )
+
 
 class DashboardAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_dashboard
     def get(self, request, *args, **kwargs):
-        queryset = TaskService.get_tasks_for_user(request.user)
-        data = TaskService.get_dashboard_data(request.user, queryset)
+        data = TaskService.get_cached_dashboard_data(request.user)
         return Response(data)
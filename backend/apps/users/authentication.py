@@ -0,0 +1,47 @@
+from django.contrib.auth.models import User
+from django.db.models import DEFERRED
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import denylist
+
+
+def user_from_claims(token):
+    """
+    Builds the request user from the access token's profile claims without a query.
+    It is a real User, so foreign keys, filters and equality work as usual; every
+    field the token does not carry is deferred and loaded on first access.
+    """
+    known = {
+        'id': token[api_settings.USER_ID_CLAIM],
+        'username': token['usr'],
+        'is_staff': token['stf'],
+        'is_superuser': token['su'],
+        # Tokens are only issued to active users; deactivation revokes them
+        'is_active': True,
+    }
+    fields = User._meta.concrete_fields
+    user = User.from_db(None, [field.attname for field in fields], [known.get(field.attname, DEFERRED) for field in fields])
+    user.token_is_admin = token['adm']
+    return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without a database lookup per request. The user comes from the
+    token's claims (apps.users.tokens) and revocation is checked against the
+    denylist, which lives in the shared cache with a short-lived copy in each process.
+    Tokens minted before the claims existed fall back to loading the user.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if denylist.is_revoked(token):
+            raise InvalidToken({'detail': 'Token has been revoked.', 'code': 'token_revoked'})
+        return token
+
+    def get_user(self, validated_token):
+        if 'usr' not in validated_token:
+            return super().get_user(validated_token)
+        return user_from_claims(validated_token)
@@ -0,0 +1,12 @@
+from core.caching import invalidate_tags
+
+# Tag of everything that shows user data: the user listings and task lists.
+USERS_TAG = 'users'
+
+
+def users_tags(request, *args, **kwargs):
+    return [USERS_TAG]
+
+
+def users_changed():
+    invalidate_tags([USERS_TAG])
@@ -0,0 +1,78 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+
+REVOKED_KEY = 'auth:revoked:{key}'
+# Access token claim holding the jti of the refresh token it was minted from
+SESSION_CLAIM = 'sid'
+
+# Process-local copy of recent answers: key -> (revoked_at or None, valid until).
+# Lets most requests skip the shared cache; revocations made elsewhere are seen
+# after at most JWT_DENYLIST_LOCAL_SECONDS.
+_local = {}
+
+
+def session_key(token):
+    # A refresh token is its own session
+    return f'sid:{token.get(SESSION_CLAIM) or token[api_settings.JTI_CLAIM]}'
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+def max_token_lifetime():
+    # An access token can be minted just before its refresh token expires
+    return api_settings.REFRESH_TOKEN_LIFETIME + api_settings.ACCESS_TOKEN_LIFETIME
+
+
+def revoke(key, ttl):
+    """Rejects every token under ``key`` issued up to now, for ``ttl`` (a timedelta)."""
+    seconds = max(int(ttl.total_seconds()), 1)
+    revoked_at = int(time.time())
+    cache.set(REVOKED_KEY.format(key=key), revoked_at, timeout=seconds)
+    _local[key] = (revoked_at, time.monotonic() + settings.JWT_DENYLIST_LOCAL_SECONDS)
+
+
+def revoke_session(token):
+    """Logs out the session of a refresh token: it and every access token minted from it."""
+    remaining = timedelta(seconds=max(token['exp'] - int(time.time()), 0))
+    revoke(session_key(token), remaining + api_settings.ACCESS_TOKEN_LIFETIME)
+
+
+def revoke_user(user_id):
+    """Rejects every token issued to the user so far, e.g. on deactivation."""
+    revoke(user_key(user_id), max_token_lifetime())
+
+
+def revoke_users(user_ids):
+    for user_id in user_ids:
+        revoke_user(user_id)
+
+
+def is_revoked(token):
+    """Checks a validated token against the session and user denylists."""
+    keys = [session_key(token), user_key(token[api_settings.USER_ID_CLAIM])]
+    now = time.monotonic()
+    revoked_at = {}
+    missing = []
+    for key in keys:
+        entry = _local.get(key)
+        if entry is not None and entry[1] > now:
+            revoked_at[key] = entry[0]
+        else:
+            missing.append(key)
+
+    if missing:
+        found = cache.get_many([REVOKED_KEY.format(key=key) for key in missing])
+        if len(_local) >= settings.JWT_DENYLIST_LOCAL_MAX_ENTRIES:
+            _local.clear()
+        for key in missing:
+            revoked_at[key] = found.get(REVOKED_KEY.format(key=key))
+            _local[key] = (revoked_at[key], now + settings.JWT_DENYLIST_LOCAL_SECONDS)
+
+    return any(value is not None and token['iat'] <= value for value in revoked_at.values())
+
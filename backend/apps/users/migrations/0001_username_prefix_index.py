@@ -0,0 +1,26 @@
+from django.db import migrations
+
+# Matches the UPPER(username::text) LIKE 'PREFIX%' that username__istartswith compiles to.
+CREATE_INDEX = (
+    'CREATE INDEX IF NOT EXISTS users_username_upper_like_idx '
+    'ON auth_user (UPPER(username::text) text_pattern_ops)'
+)
+DROP_INDEX = 'DROP INDEX IF EXISTS users_username_upper_like_idx'
+
+
+def run_on_postgresql(statement):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgresql(CREATE_INDEX), run_on_postgresql(DROP_INDEX)),
+    ]
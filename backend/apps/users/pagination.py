@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class UsernameCursorPagination(CursorPagination):
+    """Keyset pagination over the unique username, in alphabetical order."""
+    ordering = ('username',)
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
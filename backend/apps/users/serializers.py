@@ -1,5 +1,10 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from . import denylist
+from .services import UserService
+from .tokens import ProfileRefreshToken
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -10,13 +15,22 @@ class UserCreateSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'password', 'first_name', 'last_name','is_staff','is_superuser']
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email', ''),
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', ''),
-            is_staff = validated_data.get('is_staff',False),
-            is_superuser=validated_data.get('is_superuser',False),
-        )
-        return user
+        return UserService.create_user(**validated_data)
+
+
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ProfileRefreshToken
+
+
+class ProfileTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = ProfileRefreshToken
+
+
+class LogoutSerializer(serializers.Serializer):
+    """Revokes the session of a refresh token, see apps.users.denylist."""
+    refresh = serializers.CharField(write_only=True)
+    token_class = ProfileRefreshToken
+
+    def validate(self, attrs):
+        denylist.revoke_session(self.token_class(attrs['refresh']))
+        return {}
@@ -4,6 +4,32 @@ from ..tasks.models import Task
 
 
 class UserService:
+    @staticmethod
+    def search_users(search: str = '', active_only: bool = False):
+        """
+        Users whose username starts with ``search``, case-insensitively. On PostgreSQL
+        the match is served by users_username_upper_like_idx.
+        """
+        users = User.objects.all()
+        if active_only:
+            users = users.filter(is_active=True)
+        search = search.strip()
+        if search:
+            users = users.filter(username__istartswith=search)
+        return users
+
+    @staticmethod
+    def create_user(**validated_data):
+        return User.objects.create_user(
+            username=validated_data['username'],
+            email=validated_data.get('email', ''),
+            password=validated_data['password'],
+            first_name=validated_data.get('first_name', ''),
+            last_name=validated_data.get('last_name', ''),
+            is_staff=validated_data.get('is_staff', False),
+            is_superuser=validated_data.get('is_superuser', False),
+        )
+
     @staticmethod
     def can_delete_user(user_to_delete: User):
         """
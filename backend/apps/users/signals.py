@@ -0,0 +1,47 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, denylist
+
+# Carried by access tokens (apps.users.tokens), so changing them must revoke the tokens
+PRIVILEGE_FIELDS = ('is_staff', 'is_superuser')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_users_version(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no cached listing shows.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    cache.users_changed()
+
+
+@receiver(post_save, sender=User)
+def revoke_inactive_user_tokens(sender, instance, created=False, **kwargs):
+    if not created and not instance.is_active:
+        denylist.revoke_user(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def load_saved_privileges(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields is not None and not set(PRIVILEGE_FIELDS) & set(update_fields)):
+        return
+    saved = User.objects.using(router.db_for_write(User)).filter(pk=instance.pk)
+    instance._saved_privileges = saved.values_list(*PRIVILEGE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def revoke_demoted_user_tokens(sender, instance, created=False, **kwargs):
+    saved = instance.__dict__.pop('_saved_privileges', None)
+    if saved is not None and saved != tuple(getattr(instance, field) for field in PRIVILEGE_FIELDS):
+        # After commit: a token refreshed before then would still carry the old flags
+        transaction.on_commit(partial(denylist.revoke_users, [instance.pk]))
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    denylist.revoke_user(instance.pk)
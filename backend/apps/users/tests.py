@@ -1,3 +1,216 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import denylist
+from .middleware import JWTAuthMiddleware
+
+
+class JWTAuthMiddlewareTests(TransactionTestCase):
+    def setUp(self):
+        # Ids are reused across tests; earlier revocations must not apply to this user
+        cache.clear()
+        denylist._local.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.scopes = []
+
+        async def inner(scope, receive, send):
+            self.scopes.append(scope)
+
+        self.middleware = JWTAuthMiddleware(inner)
+
+    def connect(self, query_string):
+        scope = {'type': 'websocket', 'query_string': query_string.encode()}
+        async_to_sync(self.middleware)(scope, None, None)
+        return self.scopes[-1]
+
+    def test_valid_token_sets_user(self):
+        scope = self.connect(f'token={AccessToken.for_user(self.user)}')
+        self.assertEqual(scope['user'], self.user)
+
+    def test_invalid_token_is_anonymous(self):
+        scope = self.connect('token=not-a-token')
+        self.assertFalse(scope['user'].is_authenticated)
+
+    def test_missing_token_leaves_scope_untouched(self):
+        scope = self.connect('')
+        self.assertNotIn('user', scope)
+
+
+class AssigneeLookupTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        User.objects.bulk_create([User(username=f'bob{i:02}') for i in range(30)])
+        User.objects.create_user(username='gone', password='pass', is_active=False)
+        self.client.force_authenticate(self.user)
+
+    def test_pages_are_searchable_by_prefix(self):
+        response = self.client.get(reverse('assignee-lookup'), {'search': 'BOB', 'page_size': 25})
+        self.assertEqual([user['username'] for user in response.data['results']], [f'bob{i:02}' for i in range(25)])
+        self.assertEqual(set(response.data['results'][0]), {'id', 'username', 'first_name', 'last_name'})
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_inactive_users_are_not_listed(self):
+        response = self.client.get(reverse('assignee-lookup'), {'search': 'go'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_pages_are_cached_until_users_change(self):
+        self.client.get(reverse('assignee-lookup'), {'search': 'al'})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('assignee-lookup'), {'search': 'al'})
+        self.assertEqual([user['username'] for user in response.data['results']], ['alice'])
+
+        User.objects.create_user(username='alfred', password='pass')
+        response = self.client.get(reverse('assignee-lookup'), {'search': 'al'})
+        self.assertEqual([user['username'] for user in response.data['results']], ['alfred', 'alice'])
+
+    def test_logins_do_not_invalidate(self):
+        self.client.get(reverse('assignee-lookup'))
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('assignee-lookup'))
+
+
+class UserListTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='pass', is_staff=True)
+        User.objects.bulk_create([User(username=f'user{i:02}') for i in range(30)])
+        self.client.force_authenticate(self.admin)
+
+    def usernames(self, **params):
+        response = self.client.get(reverse('user-list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data['results']]
+
+    def test_list_is_paginated_and_searchable(self):
+        response = self.client.get(reverse('user-list'), {'page_size': 10})
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(
+            set(response.data['results'][0]),
+            {'id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser'},
+        )
+        self.assertEqual(self.usernames(search='USER0', page_size=100), [f'user0{i}' for i in range(10)])
+
+    def test_cache_is_invalidated_by_user_service_writes(self):
+        self.assertEqual(self.usernames(search='new'), [])
+        with self.assertNumQueries(0):
+            self.usernames(search='new')
+
+        self.client.post(reverse('register-list'), {'username': 'newcomer', 'password': 'pass'})
+        self.assertEqual(self.usernames(search='new'), ['newcomer'])
+
+        newcomer = User.objects.get(username='newcomer')
+        self.client.put(reverse('update-user-info', args=[newcomer.id]), {'first_name': 'Nina'})
+        self.assertEqual(self.client.get(reverse('user-list'), {'search': 'new'}).data['results'][0]['first_name'], 'Nina')
+
+        self.client.delete(reverse('delete-user-info', args=[newcomer.id]))
+        self.assertEqual(self.usernames(search='new'), [])
+
+
+class AuthorizationClaimsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='pass')
+        self.user.groups.add(Group.objects.create(name='Admin'))
+
+    def test_user_info_reads_the_cached_profile(self):
+        self.client.force_authenticate(self.user)
+        self.client.get(reverse('user-info'))
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('user-info'))
+        self.assertEqual(response.data['groups'], ['Admin'])
+        self.assertTrue(response.data['is_admin'])
+
+    def test_access_tokens_carry_profile_claims(self):
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'alice', 'password': 'pass'})
+        access = AccessToken(response.data['access'])
+        self.assertEqual((access['usr'], access['grp'], access['adm'], access['su']), ('alice', ['Admin'], True, False))
+        self.assertNotIn('grp', RefreshToken(response.data['refresh']).payload)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.clear()
+        # Leaving the Admin group revokes the user's tokens; a new login carries the new claims
+        response = self.client.post(reverse('token_refresh'), {'refresh': response.data['refresh']})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'alice', 'password': 'pass'})
+        access = AccessToken(response.data['access'])
+        self.assertEqual((access['grp'], access['adm']), ([], False))
+
+
+class StatelessJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        denylist._local.clear()
+        self.user = User.objects.create_user(username='alice', password='pass', email='alice@example.com')
+        self.tokens = self.client.post(reverse('token_obtain_pair'), {'username': 'alice', 'password': 'pass'}).data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+
+    def test_user_comes_from_the_token(self):
+        # The only query loads the fields the token does not carry
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('user-info'))
+        self.assertEqual((response.data['id'], response.data['username']), (self.user.pk, 'alice'))
+        self.assertEqual(response.data['email'], 'alice@example.com')
+
+    def test_logout_revokes_the_session(self):
+        other = self.client.post(reverse('token_obtain_pair'), {'username': 'alice', 'password': 'pass'}).data
+        response = self.client.post(reverse('logout'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('user-info')).status_code, 401)
+        response = self.client.post(reverse('token_refresh'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {other['access']}")
+        self.assertEqual(self.client.get(reverse('user-info')).status_code, 200)
+
+    def test_logout_rejects_invalid_tokens(self):
+        self.assertEqual(self.client.post(reverse('logout'), {'refresh': 'nonsense'}).status_code, 401)
+        self.assertEqual(self.client.post(reverse('logout'), {}).status_code, 400)
+
+    def test_deactivation_revokes_every_token(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('user-info')).status_code, 401)
+        response = self.client.post(reverse('token_refresh'), {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_losing_admin_rights_revokes_every_token(self):
+        admins = Group.objects.create(name='Admin')
+        self.user.groups.add(admins)
+        cache.clear()
+        denylist._local.clear()
+        tokens = self.client.post(reverse('token_obtain_pair'), {'username': 'alice', 'password': 'pass'}).data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get(reverse('user-info')).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admins.user_set.remove(self.user)
+        self.assertEqual(self.client.get(reverse('user-info')).status_code, 401)
+
+    def test_privilege_changes_revoke_every_token(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_name = 'Smith'
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('user-info')).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_staff = True
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('user-info')).status_code, 401)
+
+    def test_local_copy_spares_the_shared_cache(self):
+        self.client.get(reverse('user-info'))
+        with mock.patch.object(denylist.cache, 'get_many') as get_many:
+            self.assertEqual(self.client.get(reverse('user-info')).status_code, 200)
+        get_many.assert_not_called()
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from ..tasks.permissions import authorization_profile
+from . import denylist
+
+
+def profile_claims(user):
+    """
+    Compact authorization claims for access tokens: username, group names and the
+    admin, staff and superuser flags. Permissions are left out to keep tokens small.
+    """
+    profile = authorization_profile(user)
+    return {
+        'usr': user.username,
+        'grp': profile['groups'],
+        'adm': profile['is_admin'],
+        'stf': user.is_staff,
+        'su': user.is_superuser,
+    }
+
+
+class ProfileRefreshToken(RefreshToken):
+    """
+    Refresh token whose access tokens carry profile_claims(). The claims are taken
+    when each access token is minted, at login and on every refresh, so they are never
+    staler than the access token lifetime; refresh tokens themselves carry none.
+    Access tokens also carry the refresh token's jti as ``sid`` so logging out
+    revokes the whole session (see apps.users.denylist).
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.user = user
+        return token
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = getattr(self, 'user', None)
+        if user is None:
+            user = User.objects.filter(**{api_settings.USER_ID_FIELD: self.payload[api_settings.USER_ID_CLAIM]}).first()
+        if user is not None:
+            access.payload.update(profile_claims(user))
+        access[denylist.SESSION_CLAIM] = self[api_settings.JTI_CLAIM]
+        return access
+
+    def verify(self):
+        super().verify()
+        if denylist.is_revoked(self):
+            raise TokenError('Token has been revoked')
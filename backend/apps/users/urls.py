@@ -1,8 +1,8 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from .views import (user_info, user_list,
-                    UserCreateViewSet, update_user_info, UserDeleteAPIView)
+from .views import (user_info, UserListAPIView,
+                    UserCreateViewSet, update_user_info, UserDeleteAPIView, AssigneeLookupAPIView)
 
 # Router config
 router = DefaultRouter()
@@ -12,5 +12,6 @@ urlpatterns = [
     path("update/<int:id>/", update_user_info, name="update-user-info"),
     path("delete/<int:id>/", UserDeleteAPIView.as_view(), name="delete-user-info"),
     path('info/', user_info, name='user-info'),
-    path('list/', user_list, name='user-list'),
+    path('list/', UserListAPIView.as_view(), name='user-list'),
+    path('assignees/', AssigneeLookupAPIView.as_view(), name='assignee-lookup'),
 ] + router.urls
@@ -1,4 +1,5 @@
 from rest_framework.exceptions import NotFound
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db.models import Q
 from rest_framework import mixins
@@ -7,15 +8,27 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenViewBase
+
+from core.caching import cache_response
 
 from ..tasks.models import Task
-from .serializers import UserCreateSerializer
+from ..tasks.permissions import authorization_profile
+from . import cache
+from .pagination import UsernameCursorPagination
+from .serializers import LogoutSerializer, UserCreateSerializer
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_info(request):
     user = request.user
+    # Users authenticated from token claims load their remaining fields in one query
+    deferred = user.get_deferred_fields() & {'email', 'first_name', 'last_name'}
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    # Groups and permissions come from the cached authorization profile
+    profile = authorization_profile(user)
     return Response({
         "id": user.id,
         "username": user.username,
@@ -24,32 +37,54 @@ def user_info(request):
         "last_name": user.last_name,
         "is_staff": user.is_staff,
         "is_superuser": user.is_superuser,
-        "groups": list(user.groups.values_list('name', flat=True)),
-        "permissions": list(user.get_all_permissions())
+        "groups": profile['groups'],
+        "permissions": profile['permissions'],
+        "is_admin": profile['is_admin'],
     })
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def user_list(request):
-    users = User.objects.all()
-    user_data = [
-        {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "is_staff": user.is_staff,
-            "is_superuser":user.is_superuser
-        }
-        for user in users
-    ]
-
-    return Response(user_data)
-
 from .services import UserService
 
+
+class LogoutView(TokenViewBase):
+    """
+    Takes a refresh token and revokes its session: the refresh token and every
+    access token minted from it stop working at once.
+    """
+    serializer_class = LogoutSerializer
+
+
+class UserListingView(APIView):
+    """
+    Base for the user listings: a cursor-paginated page of ``columns``, with
+    ``?search=`` matching the start of the username. Subclasses cache their pages
+    until a user is created, changed or deleted.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = UsernameCursorPagination
+    columns = ()
+    active_only = False
+
+    def get(self, request, *args, **kwargs):
+        users = UserService.search_users(request.query_params.get('search', ''), active_only=self.active_only)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(users.values(*self.columns), request, self)
+        return paginator.get_paginated_response(page)
+
+
+class UserListAPIView(UserListingView):
+    """The user directory."""
+    columns = ('id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser')
+    get = cache_response('users:list', cache.users_tags, timeout=settings.USER_LISTING_CACHE_TIMEOUT)(UserListingView.get)
+
+
+class AssigneeLookupAPIView(UserListingView):
+    """Users tasks can be assigned to, for assignee pickers and the task ``assigned_to`` filter."""
+    columns = ('id', 'username', 'first_name', 'last_name')
+    active_only = True
+    get = cache_response('users:assignees', cache.users_tags, timeout=settings.USER_LISTING_CACHE_TIMEOUT)(UserListingView.get)
+
+
 class UserDeleteAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
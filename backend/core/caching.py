@@ -0,0 +1,165 @@
+"""
+Shared caching helpers: tag versions, cached DRF responses and hit/miss metrics.
+
+A tag names a set of data, e.g. "users" or one user's tasks. Its version is the
+time of the last change, in nanoseconds. Every cached entry that depends on a
+tag has the tag's version in its key, so invalidate_tags() makes all of those
+entries stale at once without finding or deleting them. Signals in the apps
+invalidate the tags (apps.tasks.signals, apps.users.signals).
+"""
+import hashlib
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from .db_router import may_be_stale
+
+TAG_KEY = 'tag:{tag}'
+RESPONSE_KEY = 'response:{name}:{user_id}:{digest}'
+METRIC_KEY = 'metrics:{name}:{outcome}'
+
+# Names of the caches that record metrics, filled in as they are declared
+METRIC_NAMES = set()
+
+
+def tag_versions(tags, create=True):
+    """
+    Current versions of ``tags``, in order. A missing version starts at the current
+    time, so an evicted tag can never come back to a value older entries used. With
+    ``create=False`` a missing version is None instead, e.g. for tags named after
+    something the client chose, which must not leave keys behind.
+    """
+    keys = [TAG_KEY.format(tag=tag) for tag in tags]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing and create:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key) for key in keys]
+
+
+def tag_version(tag, create=True):
+    return tag_versions([tag], create)[0]
+
+
+def start_tag_version(tag, timeout):
+    """Gives ``tag`` a version, kept for ``timeout`` seconds, unless it has one."""
+    cache.add(TAG_KEY.format(tag=tag), time.time_ns(), timeout=timeout)
+
+
+def invalidate_tags(tags, timeout=None):
+    """
+    Makes every entry cached under any of ``tags`` stale. The new versions are kept
+    for ``timeout`` seconds (default forever); per-object tags should expire.
+
+    Inside a transaction the tags are bumped now, so this connection stops serving
+    the old entries, and again once it commits: until then other requests still read
+    the old rows and may cache them under the first bump.
+    """
+    tags = list(tags)
+    _set_versions(tags, timeout)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(partial(_set_versions, tags, timeout))
+
+
+def _set_versions(tags, timeout):
+    now = time.time_ns()
+    cache.set_many({TAG_KEY.format(tag=tag): now for tag in tags}, timeout=timeout)
+
+
+def register_metrics(name):
+    METRIC_NAMES.add(name)
+    return name
+
+
+def record(name, hit):
+    """Counts a hit or a miss of the cache ``name``; shared by every process."""
+    if not settings.CACHE_METRICS:
+        return
+    key = METRIC_KEY.format(name=name, outcome='hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First count, or the counter was evicted; another process may get there first.
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def metrics():
+    """Hits, misses and hit rate of every registered cache, by name."""
+    names = sorted(METRIC_NAMES)
+    counts = cache.get_many([METRIC_KEY.format(name=name, outcome=outcome) for name in names for outcome in ('hits', 'misses')])
+    result = {}
+    for name in names:
+        hits = counts.get(METRIC_KEY.format(name=name, outcome='hits'), 0)
+        misses = counts.get(METRIC_KEY.format(name=name, outcome='misses'), 0)
+        result[name] = {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else None}
+    return result
+
+
+def reset_metrics():
+    cache.delete_many([METRIC_KEY.format(name=name, outcome=outcome) for name in METRIC_NAMES for outcome in ('hits', 'misses')])
+
+
+def item_count(data):
+    """Number of items in response data: the page of a paginated response, a list, or one object."""
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return len(data['results'])
+    return len(data) if isinstance(data, list) else 1
+
+
+def response_cache_key(name, request, tags, versions, vary=()):
+    # Query parameters are sorted so ?a=1&b=2 and ?b=2&a=1 share an entry. The host is
+    # part of the key because paginated responses hold absolute next/previous links.
+    params = sorted(request.query_params.lists())
+    parts = [request.get_host(), request.path, repr(params), *map(str, vary), *tags, *map(str, versions)]
+    digest = hashlib.md5('\n'.join(parts).encode()).hexdigest()
+    return RESPONSE_KEY.format(name=name, user_id=request.user.pk, digest=digest)
+
+
+def cache_response(name, tags, timeout=None, vary=None):
+    """
+    Caches the data of successful GET responses of a DRF view method, per user and
+    query parameters, until one of ``tags(request, *args, **kwargs)`` is invalidated
+    or ``timeout`` (default VIEW_CACHE_TIMEOUT) passes. ``vary(request)`` may return
+    anything else the response depends on, e.g. the date. Only ``response.data`` is
+    stored, and not when it may come from a replica behind the tags (core.db_router)
+    or holds more than VIEW_CACHE_MAX_ITEMS items, e.g. an unpaginated list; headers
+    set by the method are not replayed on a hit. Responses carry an
+    ``X-Cache: HIT`` or ``MISS`` header and hits and misses are counted as ``name``.
+    """
+    register_metrics(name)
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(view, request, *args, **kwargs)
+            view_tags = tags(request, *args, **kwargs)
+            versions = tag_versions(view_tags)
+            key = response_cache_key(name, request, view_tags, versions, vary(request) if vary else ())
+            data = cache.get(key)
+            record(name, hit=data is not None)
+            if data is not None:
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            response = method(view, request, *args, **kwargs)
+            # Data read from a lagging replica must not be stored under the new versions
+            if (
+                response.status_code == 200 and isinstance(response, Response)
+                and item_count(response.data) <= settings.VIEW_CACHE_MAX_ITEMS
+                and not may_be_stale(max(versions))
+            ):
+                cache.set(key, response.data, timeout=timeout or settings.VIEW_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,212 @@
+"""
+Read-replica routing.
+
+Reads made while serving a safe request (GET, HEAD, OPTIONS) go to a replica.
+Everything else goes to the primary ("default"):
+- writes, and every query of an unsafe request
+- reads after the request has written
+- reads by a user who wrote within the last DATABASE_REPLICA_PIN_SECONDS
+  (read-your-writes; see pin_to_primary)
+- queries made outside a request, e.g. management commands and websocket consumers
+
+A replica whose replication lag exceeds DATABASE_REPLICA_MAX_LAG is skipped. A view
+can override the choice with ``read_database`` (see below).
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject
+
+PIN_KEY = 'db:pinned:{user_id}'
+PRIMARY = 'primary'
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received.
+LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+"""
+
+_routing = ContextVar('database_routing', default=None)
+# alias -> (lag in seconds, monotonic time it was measured)
+_lag = {}
+
+
+def replica_lag(alias):
+    """Replication lag of ``alias``, measured at most every DATABASE_REPLICA_LAG_CHECK_INTERVAL seconds."""
+    lag, checked_at = _lag.get(alias, (None, None))
+    now = time.monotonic()
+    if checked_at is None or now - checked_at > settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL:
+        connection = connections[alias]
+        try:
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(LAG_SQL)
+                    lag = float(cursor.fetchone()[0] or 0)
+            else:
+                lag = 0.0
+        except DatabaseError:
+            # An unreachable replica is as good as one that is infinitely behind
+            lag = float('inf')
+        _lag[alias] = (lag, now)
+    return lag
+
+
+def healthy_replicas():
+    return [alias for alias in settings.DATABASE_REPLICAS if replica_lag(alias) <= settings.DATABASE_REPLICA_MAX_LAG]
+
+
+def pin_to_primary(user_id):
+    """
+    Sends the user's reads to the primary for DATABASE_REPLICA_PIN_SECONDS, so they
+    see what was just written for them. The middleware does it after a request that
+    wrote; writes made elsewhere, e.g. over a websocket, go through services that call it.
+    """
+    if not settings.DATABASE_REPLICAS or user_id is None:
+        return
+    routing = _routing.get()
+    if routing is not None:
+        if user_id in routing.pinned_users:
+            return
+        routing.pinned_users.add(user_id)
+    cache.set(PIN_KEY.format(user_id=user_id), 1, timeout=settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def read_database(choice):
+    """
+    Makes a view, a view method or a viewset action read from the PRIMARY (e.g. when
+    it must see the latest writes) or from a REPLICA even right after the user wrote
+    (e.g. exports, which can lag a little). Class views can set the same attribute.
+    """
+    def decorator(view):
+        view.read_database = choice
+        return view
+    return decorator
+
+
+def _view_choice(view_func, method):
+    choice = getattr(view_func, 'read_database', None)
+    cls = getattr(view_func, 'cls', None)
+    if choice is None and cls is not None:
+        # DRF views: the handler (or viewset action) first, then the class
+        actions = getattr(view_func, 'actions', None) or {}
+        handler = getattr(cls, actions.get(method.lower(), method.lower()), None)
+        choice = getattr(handler, 'read_database', None) or getattr(cls, 'read_database', None)
+    return choice
+
+
+class RequestRouting:
+    """Routing state of one request, shared by every query it makes."""
+
+    def __init__(self, request):
+        self.request = request
+        self.choice = None if request.method in SAFE_METHODS else PRIMARY
+        self.wrote = False
+        self.replica = None
+        self._pinned = None
+        # Users pinned during this request, so the pin is written once
+        self.pinned_users = set()
+
+    def user(self):
+        """The request's user once it is known, else None."""
+        user = getattr(self.request, 'user', None)
+        if isinstance(user, SimpleLazyObject):
+            # The session user: loading it reads the session and the user, and those
+            # reads are routed here again. Only use it once something else loaded it.
+            user = getattr(self.request, '_cached_user', None)
+        return user
+
+    def pinned(self):
+        """Whether the user is pinned to the primary; None while the user is not known yet."""
+        if self._pinned is None:
+            # DRF authenticates inside the view, so look the user up on first use
+            user = self.user()
+            if user is None:
+                return None
+            if not user.is_authenticated:
+                return False
+            self._pinned = cache.get(PIN_KEY.format(user_id=user.pk)) is not None
+        return self._pinned
+
+    def read_alias(self):
+        # Reads made before the user is known (e.g. loading the session user) go to the primary
+        if self.choice == PRIMARY or self.wrote or (self.choice != REPLICA and self.pinned() is not False):
+            return DEFAULT_DB_ALIAS
+        if self.replica is None:
+            # Stick to one replica for the whole request
+            replicas = healthy_replicas()
+            self.replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+        return self.replica
+
+    @property
+    def used_replica(self):
+        return self.replica not in (None, DEFAULT_DB_ALIAS)
+
+
+def may_be_stale(changed_at_ns):
+    """
+    True if this request read from a replica that may not have replayed a change made
+    at ``changed_at_ns`` (a cache tag version) yet. Data read in such a request should
+    not be cached under that version.
+    """
+    routing = _routing.get()
+    if routing is None or not routing.used_replica:
+        return False
+    window = settings.DATABASE_REPLICA_MAX_LAG + settings.DATABASE_REPLICA_LAG_CHECK_INTERVAL
+    return time.time_ns() - changed_at_ns < window * 1_000_000_000
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related objects come from the database their parent came from
+            return instance._state.db
+        routing = _routing.get()
+        return DEFAULT_DB_ALIAS if routing is None else routing.read_alias()
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return True if {obj1._state.db, obj2._state.db} <= databases else None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class ReplicaRoutingMiddleware:
+    """Sets up the request's routing and pins users to the primary after they write."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routing = RequestRouting(request)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if routing.wrote and user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        finally:
+            _routing.reset(token)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        routing = _routing.get()
+        choice = _view_choice(view_func, request.method)
+        if routing is not None and choice is not None and request.method in SAFE_METHODS:
+            routing.choice = choice
@@ -0,0 +1,77 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures per-request database latency with a new connection per request, "
+        "persistent connections with health checks, and the psycopg pool. Each request "
+        "is the connection handling Django does around a request plus one query."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError("--requests must be at least 2 to compute percentiles.")
+        base = connections[options['database']].settings_dict
+        modes = [
+            ('new connection per request', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, False),
+            ('persistent + health checks', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}, False),
+        ]
+        if self.pool_supported(base):
+            modes.append(('psycopg pool', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, True))
+        else:
+            self.stdout.write("Skipping the pool: it needs PostgreSQL with psycopg 3.")
+
+        baseline = None
+        for index, (label, overrides, pooled) in enumerate(modes):
+            settings_dict = copy.deepcopy(base)
+            settings_dict.update(overrides)
+            settings_dict['OPTIONS'] = {key: value for key, value in base.get('OPTIONS', {}).items() if key != 'pool'}
+            if pooled:
+                settings_dict['OPTIONS']['pool'] = settings.DB_POOL_OPTIONS
+            timings = self.run(settings_dict, f'benchmark-{index}', options['requests'])
+
+            mean = statistics.fmean(timings)
+            baseline = baseline or mean
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            self.stdout.write(
+                f"{label:<28} mean {mean:7.3f} ms   p50 {statistics.median(timings):7.3f} ms   "
+                f"p95 {p95:7.3f} ms   {baseline / mean:5.1f}x"
+            )
+
+    @staticmethod
+    def pool_supported(settings_dict):
+        if settings_dict['ENGINE'] != 'django.db.backends.postgresql':
+            return False
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+        return is_psycopg3
+
+    @staticmethod
+    def run(settings_dict, alias, requests):
+        connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias)
+        timings = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                # What django.db.close_old_connections does on request_started and request_finished
+                connection.close_if_unusable_or_obsolete()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                connection.close_if_unusable_or_obsolete()
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+            if 'pool' in settings_dict['OPTIONS']:
+                connection.close_pool()
+        return timings
@@ -0,0 +1,14 @@
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, env
+
+# Development works offline: the cache stays in-process unless CACHE_URL points at
+# Redis. Like CHANNEL_LAYER=memory, it is not shared between processes.
+CACHES = {
+    'default': env.cache("CACHE_URL", default="locmemcache://task-manager"),
+}
+
+# runserver serves WSGI, where one thread handles a request from start to end:
+# keep its connection open between requests unless a pool is configured.
+for database in DATABASES.values():
+    if 'pool' not in database.get('OPTIONS', {}):
+        database['CONN_MAX_AGE'] = env.int("DB_CONN_MAX_AGE", default=60)
@@ -0,0 +1,24 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, DB_POOL_OPTIONS, env
+
+# Every worker must see the same cache: token revocations, cache tags and cached
+# responses live there. CACHE_URL is required and must point at Redis.
+CACHES = {
+    'default': env.cache("CACHE_URL"),
+}
+if 'redis' not in CACHES['default']['BACKEND'].lower():
+    raise ImproperlyConfigured("CACHE_URL must point at Redis in production.")
+# Fail fast rather than hold requests when Redis is slow or unreachable.
+CACHES['default'].setdefault('OPTIONS', {}).update({
+    'SOCKET_CONNECT_TIMEOUT': env.float("CACHE_CONNECT_TIMEOUT", default=1.0),
+    'SOCKET_TIMEOUT': env.float("CACHE_SOCKET_TIMEOUT", default=1.0),
+    'CONNECTION_POOL_KWARGS': {'max_connections': env.int("CACHE_MAX_CONNECTIONS", default=50)},
+})
+
+# Production serves ASGI (gunicorn.conf.py): pool connections unless DB_POOL=false.
+if env.bool("DB_POOL", default=True):
+    for database in DATABASES.values():
+        database.setdefault('OPTIONS', {})['pool'] = DB_POOL_OPTIONS
+        database['CONN_MAX_AGE'] = 0
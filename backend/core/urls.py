@@ -21,8 +21,9 @@ from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
-    TokenRefreshView, TokenBlacklistView,
+    TokenRefreshView,
 )
+from apps.users.views import LogoutView
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
@@ -44,7 +45,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('api/logout', TokenBlacklistView.as_view(), name='token_blacklist'),
+    path('api/logout', LogoutView.as_view(), name='logout'),
     path('api/tasks/', include('apps.tasks.urls')),
     path('api/users/', include('apps.users.urls')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -1,9 +1,35 @@
 import API from "./axios"; // your configured axios instance
 
 // Task related functions
+// Delta-sync cursor, taken from the first page of the last full load
+let taskSyncCursor: string | null = null;
+
+// The task list is cursor-paginated; walk the `next` links so callers still get the full list
 export const getTasks = async () => {
-  const response = await API.get("tasks/");
-  return response.data;
+  const tasks: any[] = [];
+  let url: string | null = "tasks/";
+  let cursor: string | null = null;
+  while (url) {
+    const response: { data: { results: any[]; next: string | null }; headers: any } = await API.get(url);
+    cursor = cursor ?? response.headers["x-sync-cursor"] ?? null;
+    tasks.push(...response.data.results);
+    url = response.data.next;
+  }
+  taskSyncCursor = cursor;
+  return tasks;
+};
+
+// Returns the tasks changed and deleted since the last load, or null when a full reload is needed
+export const getTaskChanges = async () => {
+  if (!taskSyncCursor) return null;
+  try {
+    const response = await API.get("tasks/changes/", { params: { since: taskSyncCursor } });
+    taskSyncCursor = response.data.cursor;
+    return response.data as { changed: any[]; deleted: number[] };
+  } catch (error: any) {
+    if (error?.response?.status === 410) return null;
+    throw error;
+  }
 };
 
 export const createTask = async (task: any) => {
@@ -22,9 +48,16 @@ export const deleteTask = async (id: string | number) => {
 };
 
 // User related functions
+// The user directory is cursor-paginated as well; fetched on demand, not at app start-up
 export const getUsers = async () => {
-  const response = await API.get("users/list/");
-  return response.data;
+  const users: any[] = [];
+  let url: string | null = "users/list/?page_size=100";
+  while (url) {
+    const response: { data: { results: any[]; next: string | null } } = await API.get(url);
+    users.push(...response.data.results);
+    url = response.data.next;
+  }
+  return users;
 };
 
 export const createUser = async (data: any) => {
@@ -17,7 +17,6 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }: PropsWit
   const [auth, setAuth] = useState<AuthState | null>({
     tokens: tokens,
     user_info: null,
-    user_list: [],
     user_permissions: []
   });
   const [loading, setLoading] = useState<boolean>(true); // Add a loading state
@@ -30,11 +29,9 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }: PropsWit
       localStorage.setItem("authTokens", JSON.stringify(tokens));
 
       const userInfo = await API.get("users/info/");
-      const user_list = await API.get("users/list/");
       const authData: AuthState = {
         tokens,
         user_info: userInfo?.data,
-        user_list: user_list?.data,
         user_permissions: userInfo?.data?.permissions
       };
       
@@ -86,11 +83,9 @@ export const AuthProvider: React.FC<AuthProviderProps> = ({ children }: PropsWit
         const tokens = JSON.parse(stored);
         try {
           const userInfo = await API.get("users/info/");
-          const user_list = await API.get("users/list/");
           setAuth({
             tokens,
             user_info: userInfo.data,
-            user_list: user_list.data,
             user_permissions: userInfo?.data?.permissions
           });
         } catch (err) {
@@ -1,6 +1,23 @@
-import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
-import { getTasks, createTask, updateTask, deleteTask } from "../api/FetchFucntions";
+import { useQuery, useMutation, useQueryClient, type QueryClient } from "@tanstack/react-query";
+import { getTasks, getTaskChanges, createTask, updateTask, deleteTask } from "../api/FetchFucntions";
 import toast from "react-hot-toast";
+import type { Task } from "../types/task";
+
+// Merges the server-side changes into the cached list instead of refetching it
+const syncTasks = async (queryClient: QueryClient) => {
+  const changes = await getTaskChanges();
+  if (!changes) {
+    return queryClient.invalidateQueries({ queryKey: ["tasks"] });
+  }
+  queryClient.setQueryData<Task[]>(["tasks"], (tasks = []) => {
+    const changed = new Map(changes.changed.map((task: Task) => [task.id, task]));
+    const kept = tasks
+      .filter((task) => !changes.deleted.includes(task.id))
+      .map((task) => changed.get(task.id) ?? task);
+    const keptIds = new Set(kept.map((task) => task.id));
+    return [...kept, ...changes.changed.filter((task: Task) => !keptIds.has(task.id))];
+  });
+};
 
 export const useTasks = () => {
   return useQuery({
@@ -14,7 +31,7 @@ export const useCreateTask = () => {
   return useMutation({
     mutationFn: createTask,
     onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ["tasks"] });
+      syncTasks(queryClient);
       toast.success("Task created successfully!");
     },
     onError: (error: any) => {
@@ -28,7 +45,7 @@ export const useUpdateTask = () => {
   return useMutation({
     mutationFn: updateTask,
     onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ["tasks"] });
+      syncTasks(queryClient);
       toast.success("Task updated successfully!");
     },
     onError: (error: any) => {
@@ -42,7 +59,7 @@ export const useDeleteTask = () => {
   return useMutation({
     mutationFn: deleteTask,
     onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ["tasks"] });
+      syncTasks(queryClient);
       toast.success("Task deleted successfully!");
     },
     onError: (error: any) => {
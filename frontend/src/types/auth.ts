@@ -6,7 +6,6 @@ export interface AuthTokens {
 export interface AuthState {
   tokens: AuthTokens | null;
   user_info: any;
-  user_list: any[];
   user_permissions: any[];
 }
 
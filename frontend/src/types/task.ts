@@ -8,6 +8,7 @@ export interface Task {
   created_by: number;
   assigned_to: number;
   created_on: string;
+  updated_at: string;
   priority_label: string;
   status_label: string;
   assigned_to_username?: string;